@@ -1,177 +1,220 @@
 # backend/app.py (The Final, Complete, Working Version)
 import os
 import jwt
-import whisper
+import multiprocessing
 import threading
 from functools import wraps
-from flask import Flask, jsonify, request, send_from_directory, Response
+from flask import Flask, jsonify, request, send_file, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from db import get_db_connection
+from db import db_cursor, pool_stats, pool as db_pool
+import model_registry
+import jobs
+import summarizer
+import uploads
+import events
+import blobs
+import batching
+import exports
+import translation
+import pipeline
+import transcription
+import subtitles
+import metrics
+import auth
+import time
 import uuid
 from datetime import datetime
-import io
-from docx import Document
-from fpdf import FPDF
+from urllib.parse import unquote
+import base64
 
 load_dotenv()
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'a-very-secret-key')
 
 # File upload configuration
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = uploads.UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'm4a', 'flac', 'ogg'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Werkzeug refuses larger bodies up front (413) instead of reading them;
+# the extra megabyte leaves room for multipart framing.
+app.config['MAX_CONTENT_LENGTH'] = uploads.UPLOAD_MAX_BYTES + 1024 * 1024
 
 # Create uploads directory if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(os.path.join(UPLOAD_FOLDER, uploads.PARTIAL_DIR), exist_ok=True)
+
+# Rendered exports (PDF/DOCX/TXT), kept outside the publicly served uploads folder
+app.config['EXPORT_CACHE_DIR'] = exports.EXPORT_CACHE_DIR
+os.makedirs(app.config['EXPORT_CACHE_DIR'], exist_ok=True)
 
 # THE FINAL CORS FIX: Specific and correct configuration
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}} )
+CORS(app, resources={r"/api/*": {
+    "origins": "http://localhost:3000",
+    "expose_headers": ["Upload-Offset", "Upload-Length", "Location", "Retry-After", "ETag", "Content-Disposition"]
+}})
+
+# --- Request Metrics ---
+_http_seconds = metrics.histogram(
+    'voicevista_http_request_duration_seconds', 'Request latency per route', ('method', 'route', 'status')
+)
+
+@app.before_request
+def _start_request_timer():
+    request.environ['voicevista.started'] = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    started = request.environ.get('voicevista.started')
+    if started is not None:
+        # The route pattern, not the path, keeps the label set bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        _http_seconds.observe(time.perf_counter() - started, method=request.method, route=route, status=response.status_code)
+    return response
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # --- JWT Auth Decorator ---
+def _authenticate(token, f, *args, **kwargs):
+    if not token:
+        return jsonify({'message': 'Token is missing!'}), 401
+    try:
+        # Recently verified tokens are answered from auth's claims cache
+        current_user_id = auth.verify_token(token, app.config['SECRET_KEY'])
+    except jwt.ExpiredSignatureError:
+        return jsonify({'message': 'Token has expired!'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'message': 'Token is invalid!'}), 401
+    except Exception as e:
+        return jsonify({'message': 'Token validation failed!'}), 401
+    return f(current_user_id, *args, **kwargs)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
         if 'authorization' in request.headers:
             token = request.headers['authorization'].split(' ')[1]
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user_id = data['user_id']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid!'}), 401
-        except Exception as e:
-            return jsonify({'message': 'Token validation failed!'}), 401
-        return f(current_user_id, *args, **kwargs)
+        return _authenticate(token, f, *args, **kwargs)
+    return decorated
+
+def stream_token_required(f):
+    # EventSource can't send an Authorization header, so streams also accept ?token=
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.args.get('token')
+        if 'authorization' in request.headers:
+            token = request.headers['authorization'].split(' ')[1]
+        return _authenticate(token, f, *args, **kwargs)
     return decorated
 
 # --- Auth Routes ---
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
-    hashed_password = generate_password_hash(data['password'])
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
-            (data['name'], data['email'], hashed_password)
-        )
-        user_id = cur.fetchone()[0]
-        cur.execute("INSERT INTO user_settings (user_id) VALUES (%s)", (user_id,))
-        conn.commit()
+        hashed_password = auth.hash_password(data['password'])
+    except auth.AuthBusy:
+        return _auth_busy_response()
+    try:
+        with db_cursor() as cur:
+            cur.execute(
+                "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
+                (data['name'], data['email'], hashed_password)
+            )
+            user_id = cur.fetchone()[0]
+            cur.execute("INSERT INTO user_settings (user_id) VALUES (%s)", (user_id,))
         return jsonify({'message': 'New user created!'}), 201
     except Exception as e:
-        conn.rollback()
         print(f"Registration error: {str(e)}")
         return jsonify({'message': 'Registration failed', 'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
+
+AUTH_BUSY_RETRY_AFTER = 2  # seconds
+
+def _auth_busy_response():
+    response = jsonify({'message': 'Too many sign-ins in progress, please retry shortly'})
+    response.headers['Retry-After'] = str(AUTH_BUSY_RETRY_AFTER)
+    return response, 503
 
 @app.route('/api/auth/login', methods=['POST'])
 def login():
-    auth = request.get_json()
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id, name, email, password_hash, avatar_url FROM users WHERE email = %s", (auth['email'],))
+    credentials = request.get_json()
+    with db_cursor() as cur:
+        cur.execute("SELECT id, name, email, password_hash, avatar_url FROM users WHERE email = %s", (credentials['email'],))
         user = cur.fetchone()
-        if not user:
-            return jsonify({'message': 'Invalid email or password'}), 401
-        
-        if not check_password_hash(user[3], auth['password']):
-            return jsonify({'message': 'Invalid email or password'}), 401
-        
-        token = jwt.encode({'user_id': user[0]}, app.config['SECRET_KEY'], algorithm='HS256')
-        return jsonify({
-            'token': token,
-            'user': {'id': user[0], 'name': user[1], 'email': user[2], 'avatar_url': user[4]}
-        })
-    finally:
-        cur.close()
-        conn.close()
+    if not user:
+        return jsonify({'message': 'Invalid email or password'}), 401
+    
+    # The connection is back in the pool before the (slow) hash check runs,
+    # which happens on auth's bounded hashing pool
+    try:
+        valid = auth.check_password(user[3], credentials['password'])
+    except auth.AuthBusy:
+        return _auth_busy_response()
+    if not valid:
+        return jsonify({'message': 'Invalid email or password'}), 401
+    
+    token, expires_at = auth.issue_token(user[0], app.config['SECRET_KEY'])
+    return jsonify({
+        'token': token,
+        'expires_at': expires_at.isoformat(),
+        'user': {'id': user[0], 'name': user[1], 'email': user[2], 'avatar_url': user[4]}
+    })
 
 # --- User Profile Route ---
 @app.route('/api/user/profile', methods=['GET'])
 @token_required
 def get_user_profile(current_user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            SELECT u.id, u.name, u.email, u.avatar_url, u.created_at,
-                   us.transcription_language, us.voice_diarization, us.export_format
-            FROM users u
-            LEFT JOIN user_settings us ON u.id = us.user_id
-            WHERE u.id = %s
-        """, (current_user_id,))
-        user = cur.fetchone()
+    user = auth.user_profile(current_user_id)
+    
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
         
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-            
-        return jsonify({
-            'id': user[0],
-            'name': user[1],
-            'email': user[2],
-            'avatar_url': user[3],
-            'created_at': user[4].isoformat() if user[4] else None,
-            'settings': {
-                'transcription_language': user[5],
-                'voice_diarization': user[6],
-                'export_format': user[7]
-            }
-        })
-    finally:
-        cur.close()
-        conn.close()
+    return jsonify({
+        'id': user['id'],
+        'name': user['name'],
+        'email': user['email'],
+        'avatar_url': user['avatar_url'],
+        'created_at': user['created_at'].isoformat() if user['created_at'] else None,
+        'settings': dict(user['settings'], model_size=user['settings']['model_size'] or model_registry.WHISPER_MODEL),
+        'available_model_sizes': model_registry.WHISPER_ALLOWED_MODELS
+    })
 
 # --- Update User Profile Route ---
 @app.route('/api/user/profile', methods=['PUT'])
 @token_required
 def update_user_profile(current_user_id):
     data = request.get_json()
-    conn = get_db_connection()
-    cur = conn.cursor()
+    model_size = data.get('settings', {}).get('model_size') or model_registry.WHISPER_MODEL
+    if model_size not in model_registry.WHISPER_ALLOWED_MODELS and model_size != model_registry.WHISPER_MODEL:
+        return jsonify({'message': f"Invalid model size. Allowed: {', '.join(model_registry.WHISPER_ALLOWED_MODELS)}"}), 400
     try:
-        # Update user basic info
-        cur.execute("""
-            UPDATE users 
-            SET name = %s, email = %s
-            WHERE id = %s
-        """, (data.get('name'), data.get('email'), current_user_id))
-        
-        # Update user settings
-        cur.execute("""
-            UPDATE user_settings 
-            SET transcription_language = %s, voice_diarization = %s, export_format = %s
-            WHERE user_id = %s
-        """, (
-            data.get('settings', {}).get('transcription_language', 'English'),
-            data.get('settings', {}).get('voice_diarization', True),
-            data.get('settings', {}).get('export_format', 'pdf'),
-            current_user_id
-        ))
-        
-        conn.commit()
+        with db_cursor() as cur:
+            # Update user basic info
+            cur.execute("""
+                UPDATE users 
+                SET name = %s, email = %s
+                WHERE id = %s
+            """, (data.get('name'), data.get('email'), current_user_id))
+            
+            # Update user settings
+            cur.execute("""
+                UPDATE user_settings 
+                SET transcription_language = %s, voice_diarization = %s, export_format = %s, model_size = %s
+                WHERE user_id = %s
+            """, (
+                data.get('settings', {}).get('transcription_language', 'English'),
+                data.get('settings', {}).get('voice_diarization', True),
+                data.get('settings', {}).get('export_format', 'pdf'),
+                None if model_size == model_registry.WHISPER_MODEL else model_size,
+                current_user_id
+            ))
+        auth.invalidate_user(current_user_id)
         return jsonify({'message': 'Profile updated successfully'})
     except Exception as e:
-        conn.rollback()
         return jsonify({'message': 'Profile update failed', 'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
 
 # --- Avatar Upload Route ---
 @app.route('/api/user/avatar', methods=['POST'])
@@ -198,325 +241,746 @@ def upload_avatar(current_user_id):
     file.save(file_path)
     
     # Update database
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute("""
-            UPDATE users 
-            SET avatar_url = %s
-            WHERE id = %s
-        """, (unique_filename, current_user_id))
-        conn.commit()
+        with db_cursor() as cur:
+            cur.execute("""
+                UPDATE users 
+                SET avatar_url = %s
+                WHERE id = %s
+            """, (unique_filename, current_user_id))
+        auth.invalidate_user(current_user_id)
         
         return jsonify({
             'message': 'Avatar uploaded successfully',
             'avatar_url': unique_filename
         })
     except Exception as e:
-        conn.rollback()
         return jsonify({'message': 'Avatar upload failed', 'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
+
+def _queue_full_response(depth):
+    response = jsonify({
+        'message': 'Transcription queue is full, please retry shortly',
+        'queue_depth': depth
+    })
+    response.headers['Retry-After'] = str(jobs.JOB_RETRY_BACKOFF)
+    return response, 429
+
+def _too_large_response():
+    limit_mb = uploads.UPLOAD_MAX_BYTES // (1024 * 1024)
+    return jsonify({'message': f'File too large. Maximum size: {limit_mb}MB'}), 413
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return _too_large_response()
+
+def _check_queue_capacity():
+    # Push back before touching disk if the transcription backlog is full
+    with db_cursor() as cur:
+        depth = jobs.queue_depth(cur)
+    if depth >= jobs.JOB_QUEUE_MAX_DEPTH:
+        return _queue_full_response(depth)
+    return None
+
+def _register_upload(current_user_id, original_filename, file_path, size, sha256):
+    # Audio is stored once per content hash; if the same audio was already
+    # transcribed with the current options, the cached result is reused and no
+    # job is queued. Otherwise the transcription is queued in the same transaction.
+    folder = app.config['UPLOAD_FOLDER']
+    file_extension = original_filename.rsplit('.', 1)[1].lower()
+    new_blob = None
+    try:
+        # Settings snapshot (from auth's profile cache) travels with the job, so
+        # neither the worker nor the pipeline looks them up again
+        profile = auth.user_profile(current_user_id)
+        settings = profile['settings'] if profile else {}
+        model_size = settings.get('model_size') or model_registry.WHISPER_MODEL
+        with db_cursor() as cur:
+            cached = transcription.lookup_result(cur, sha256, transcription.decode_options(model_size))
+            blob_filename, created = blobs.acquire(cur, folder, sha256, file_extension, file_path, size)
+            if created:
+                new_blob = blob_filename
+            try:
+                if cached:
+                    cur.execute("""
+                        INSERT INTO audio_files (user_id, filename, original_filename, status, size_bytes, content_sha256,
+                                                 transcript, summary, progress, duration_seconds)
+                        VALUES (%s, %s, %s, 'completed', %s, %s, %s, %s, 100, %s) RETURNING id
+                    """, (current_user_id, blob_filename, original_filename, size, sha256,
+                          cached['text'], cached['summary'], cached['duration']))
+                    file_id = cur.fetchone()[0]
+                    transcription.copy_segments(cur, file_id, cached['segments'])
+                    pipeline.start(cur, file_id, settings)
+                    job_id, position = None, 0
+                else:
+                    cur.execute("""
+                        INSERT INTO audio_files (user_id, filename, original_filename, status, size_bytes, content_sha256)
+                        VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
+                    """, (current_user_id, blob_filename, original_filename, 'processing', size, sha256))
+                    file_id = cur.fetchone()[0]
+                    job_id, position = jobs.enqueue(cur, 'transcribe', file_id, {
+                        'file_path': os.path.join(folder, blob_filename),
+                        'model': model_size,
+                        'settings': settings
+                    })
+            except Exception:
+                # Remove a new blob file before the rollback, while the row lock
+                # still holds back a concurrent upload of the same content
+                if new_blob:
+                    blobs.discard(folder, new_blob)
+                    new_blob = None
+                raise
+        new_blob = None  # committed
+        
+        return jsonify({
+            'message': 'File uploaded successfully',
+            'file_id': file_id,
+            'filename': original_filename,
+            'job_id': job_id,
+            'queue_position': position,
+            'cached': bool(cached)
+        }), 201
+        
+    except jobs.QueueFull as e:
+        _discard_upload(folder, file_path, new_blob)
+        return _queue_full_response(e.depth)
+    except Exception as e:
+        _discard_upload(folder, file_path, new_blob)
+        return jsonify({'message': 'Upload failed', 'error': str(e)}), 500
+
+def _discard_upload(folder, file_path, new_blob):
+    # The blob reference rolled back with the transaction. new_blob is only
+    # still set if the commit itself failed after the file was moved into place.
+    if new_blob:
+        blobs.discard(folder, new_blob)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+def _raw_upload_filename():
+    # Raw-body uploads name the file in an X-Filename header (URL-encoded) or ?filename=
+    return unquote(request.headers.get('X-Filename') or request.args.get('filename', ''))
 
 # --- File Upload Route ---
 @app.route('/api/upload', methods=['POST'])
 @token_required
 def upload_audio(current_user_id):
-    if 'audio' not in request.files:
-        return jsonify({'message': 'No audio file provided'}), 400
-    
-    file = request.files['audio']
-    if file.filename == '':
+    # Reject on the declared size before reading any of the body
+    if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        return _too_large_response()
+
+    # Either a multipart form with an 'audio' field, or the raw audio bytes as
+    # the body, which is streamed straight to disk without a temp copy.
+    if request.mimetype == 'multipart/form-data':
+        if 'audio' not in request.files:
+            return jsonify({'message': 'No audio file provided'}), 400
+        file = request.files['audio']
+        original_filename = file.filename
+        stream = file.stream
+    else:
+        original_filename = _raw_upload_filename()
+        stream = request.stream
+
+    if original_filename == '':
         return jsonify({'message': 'No file selected'}), 400
     
-    if not allowed_file(file.filename):
+    if not allowed_file(original_filename):
         return jsonify({'message': 'Invalid file type. Allowed: wav, mp3, m4a, flac, ogg'}), 400
     
-    # Check file size (50MB limit)
-    file.seek(0, 2)  # Seek to end
-    file_size = file.tell()
-    file.seek(0)  # Reset to beginning
-    
-    if file_size > 50 * 1024 * 1024:  # 50MB
-        return jsonify({'message': 'File too large. Maximum size: 50MB'}), 400
-    
+    queue_full = _check_queue_capacity()
+    if queue_full:
+        return queue_full
+
     # Generate unique filename
-    file_extension = file.filename.rsplit('.', 1)[1].lower()
+    file_extension = original_filename.rsplit('.', 1)[1].lower()
     unique_filename = f"{uuid.uuid4()}.{file_extension}"
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
     
-    # Save file
-    file.save(file_path)
-    
-    # Save to database
-    conn = get_db_connection()
-    cur = conn.cursor()
+    # Stream to disk in chunks; size limit and SHA-256 are handled in the same pass
     try:
+        size, sha256 = uploads.spool_to_file(stream, file_path)
+    except uploads.UploadTooLarge:
+        return _too_large_response()
+    
+    return _register_upload(current_user_id, original_filename, file_path, size, sha256)
+
+# --- Resumable Uploads (tus-style offsets) ---
+@app.route('/api/uploads', methods=['POST'])
+@token_required
+def create_upload_session(current_user_id):
+    upload_length = request.headers.get('Upload-Length', type=int)
+    original_filename = _raw_upload_filename()
+    if not upload_length or upload_length < 0:
+        return jsonify({'message': 'Upload-Length header is required'}), 400
+    if upload_length > uploads.UPLOAD_MAX_BYTES:
+        return _too_large_response()
+    if not allowed_file(original_filename):
+        return jsonify({'message': 'Invalid file type. Allowed: wav, mp3, m4a, flac, ogg'}), 400
+    queue_full = _check_queue_capacity()
+    if queue_full:
+        return queue_full
+
+    upload_id = uuid.uuid4().hex
+    open(uploads.partial_path(app.config['UPLOAD_FOLDER'], upload_id), 'wb').close()
+    with db_cursor() as cur:
+        uploads.expire_sessions(cur, app.config['UPLOAD_FOLDER'])
         cur.execute("""
-            INSERT INTO audio_files (user_id, filename, original_filename, status)
-            VALUES (%s, %s, %s, %s) RETURNING id
-        """, (current_user_id, unique_filename, file.filename, 'processing'))
-        file_id = cur.fetchone()[0]
-        conn.commit()
-        
-        # Start transcription in background
-        def process_transcription():
+            INSERT INTO upload_sessions (id, user_id, original_filename, upload_length)
+            VALUES (%s, %s, %s, %s)
+        """, (upload_id, current_user_id, original_filename, upload_length))
+
+    response = jsonify({'upload_id': upload_id, 'offset': 0})
+    response.headers['Location'] = f"/api/uploads/{upload_id}"
+    response.headers['Upload-Offset'] = '0'
+    response.headers['Upload-Length'] = str(upload_length)
+    return response, 201
+
+def _get_upload_session(cur, current_user_id, upload_id):
+    cur.execute("""
+        SELECT upload_offset, upload_length, original_filename
+        FROM upload_sessions
+        WHERE id = %s AND user_id = %s
+    """, (upload_id, current_user_id))
+    return cur.fetchone()
+
+@app.route('/api/uploads/<upload_id>', methods=['HEAD'])
+@token_required
+def get_upload_offset(current_user_id, upload_id):
+    with db_cursor() as cur:
+        upload_session = _get_upload_session(cur, current_user_id, upload_id)
+    if not upload_session:
+        return Response(status=404)
+    return Response(status=200, headers={
+        'Upload-Offset': str(upload_session[0]),
+        'Upload-Length': str(upload_session[1]),
+        'Cache-Control': 'no-store'
+    })
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'])
+@token_required
+def append_upload_chunk(current_user_id, upload_id):
+    client_offset = request.headers.get('Upload-Offset', type=int)
+    if client_offset is None:
+        return jsonify({'message': 'Upload-Offset header is required'}), 400
+
+    folder = app.config['UPLOAD_FOLDER']
+    interrupted = False
+    try:
+        with uploads.open_partial(folder, upload_id) as partial:
+            with db_cursor() as cur:
+                upload_session = _get_upload_session(cur, current_user_id, upload_id)
+            if not upload_session:
+                return jsonify({'message': 'Upload not found'}), 404
+            offset, upload_length, original_filename = upload_session
+            if client_offset != offset:
+                response = jsonify({'message': 'Upload-Offset does not match', 'offset': offset})
+                response.headers['Upload-Offset'] = str(offset)
+                return response, 409
+
             try:
-                print(f"Starting transcription for file_id: {file_id}")
-                model = whisper.load_model("base")
-                result = model.transcribe(file_path)
-                transcript = result["text"]
-
-                # Summarize
-                try:
-                    from transformers import pipeline
-                    summarizer = pipeline('summarization', model='facebook/bart-large-cnn')
-                    summary = summarizer(transcript, max_length=60, min_length=20, do_sample=False)[0]['summary_text']
-                except Exception:
-                    summary = transcript[:200] + ('...' if len(transcript) > 200 else '')
-
-                # Update database with transcript and summary
-                conn = get_db_connection()
-                cur = conn.cursor()
-                cur.execute("""
-                    UPDATE audio_files 
-                    SET transcript = %s, summary = %s, status = 'completed'
-                    WHERE id = %s
-                """, (transcript, summary, file_id))
-                conn.commit()
-                cur.close()
-                conn.close()
-                print(f"Transcription completed for file_id: {file_id}")
-
-            except Exception as e:
-                print(f"Transcription failed for file_id {file_id}: {str(e)}")
-                # Update status to failed
-                conn = get_db_connection()
-                cur = conn.cursor()
-                cur.execute("""
-                    UPDATE audio_files 
-                    SET status = 'failed'
-                    WHERE id = %s
-                """, (file_id,))
-                conn.commit()
-                cur.close()
-                conn.close()
-        
-        # Start transcription processing in background
-        thread = threading.Thread(target=process_transcription)
-        thread.daemon = True
-        thread.start()
-        
-        return jsonify({
-            'message': 'File uploaded successfully',
-            'file_id': file_id,
-            'filename': file.filename
-        }), 201
-        
-    except Exception as e:
-        conn.rollback()
-        return jsonify({'message': 'Upload failed', 'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
+                written = uploads.write_at(partial, offset, request.stream, upload_length - offset)
+            except uploads.UploadInterrupted as e:
+                # Record what arrived so the client resumes from that byte, not the chunk start
+                written = e.written
+                interrupted = True
+            offset += written
+            with db_cursor() as cur:
+                cur.execute("UPDATE upload_sessions SET upload_offset = %s WHERE id = %s", (offset, upload_id))
+
+            if offset >= upload_length:
+                # Last chunk: move the assembled file into place and close the
+                # session while still holding the lock, so a concurrent PATCH
+                # can't finalize the same upload again
+                file_extension = original_filename.rsplit('.', 1)[1].lower()
+                file_path = os.path.join(folder, f"{uuid.uuid4()}.{file_extension}")
+                os.replace(uploads.partial_path(folder, upload_id), file_path)
+                with db_cursor() as cur:
+                    cur.execute("DELETE FROM upload_sessions WHERE id = %s", (upload_id,))
+    except FileNotFoundError:
+        return jsonify({'message': 'Upload not found'}), 404
+    except uploads.UploadBusy:
+        with db_cursor() as cur:
+            upload_session = _get_upload_session(cur, current_user_id, upload_id)
+        response = jsonify({'message': 'Another request is writing to this upload'})
+        if upload_session:
+            response.headers['Upload-Offset'] = str(upload_session[0])
+        response.headers['Retry-After'] = '1'
+        return response, 409
+    except uploads.UploadTooLarge:
+        return jsonify({'message': 'Chunk runs past the declared Upload-Length'}), 413
+
+    if interrupted:
+        response = jsonify({'message': 'Upload interrupted', 'offset': offset})
+        response.headers['Upload-Offset'] = str(offset)
+        return response, 400
+    if offset < upload_length:
+        return Response(status=204, headers={'Upload-Offset': str(offset)})
+
+    sha256 = uploads.hash_file(file_path)
+    response, status = _register_upload(current_user_id, original_filename, file_path, offset, sha256)
+    response.headers['Upload-Offset'] = str(offset)
+    return response, status
+
+LIST_PAGE_SIZE = 20
+LIST_MAX_PAGE_SIZE = 100
+SNIPPET_LENGTH = 160
+
+def _encode_list_cursor(uploaded_at, row_id):
+    raw = f"{uploaded_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_list_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        uploaded_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(uploaded_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
 
 # --- Transcriptions Route ---
 @app.route('/api/transcriptions', methods=['GET'])
 @token_required
 def get_transcriptions(current_user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
+    # Keyset pagination over (uploaded_at, id), newest first. The list only
+    # carries a short snippet; full text comes from /api/transcriptions/<id>.
     try:
-        cur.execute("""
-            SELECT id, original_filename, status, uploaded_at, transcript, summary
-            FROM audio_files 
-            WHERE user_id = %s 
-            ORDER BY uploaded_at DESC
-        """, (current_user_id,))
+        limit = min(max(int(request.args.get('limit', LIST_PAGE_SIZE)), 1), LIST_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+    cursor = request.args.get('cursor')
+    after = None
+    if cursor:
+        try:
+            after = _decode_list_cursor(cursor)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+
+    with db_cursor() as cur:
+        if after:
+            cur.execute("""
+                SELECT id, original_filename, status, uploaded_at,
+                       LEFT(COALESCE(summary, transcript, ''), %s), progress
+                FROM audio_files 
+                WHERE user_id = %s AND (uploaded_at, id) < (%s, %s)
+                ORDER BY uploaded_at DESC, id DESC
+                LIMIT %s
+            """, (SNIPPET_LENGTH, current_user_id, after[0], after[1], limit + 1))
+        else:
+            cur.execute("""
+                SELECT id, original_filename, status, uploaded_at,
+                       LEFT(COALESCE(summary, transcript, ''), %s), progress
+                FROM audio_files 
+                WHERE user_id = %s 
+                ORDER BY uploaded_at DESC, id DESC
+                LIMIT %s
+            """, (SNIPPET_LENGTH, current_user_id, limit + 1))
         transcriptions = cur.fetchall()
-        result = [{
-            'id': t[0], 
-            'title': t[1], 
-            'status': t[2], 
-            'date': t[3].strftime('%Y-%m-%d %H:%M:%S') if t[3] else None,
-            'transcript': t[4],
-            'summary': t[5]
-        } for t in transcriptions]
-        return jsonify(result)
-    finally:
-        cur.close()
-        conn.close()
+
+    has_more = len(transcriptions) > limit
+    transcriptions = transcriptions[:limit]
+    items = [{
+        'id': t[0], 
+        'title': t[1], 
+        'status': t[2], 
+        'date': t[3].strftime('%Y-%m-%d %H:%M:%S') if t[3] else None,
+        'snippet': t[4],
+        'progress': t[5]
+    } for t in transcriptions]
+    next_cursor = None
+    if has_more and transcriptions:
+        last = transcriptions[-1]
+        next_cursor = _encode_list_cursor(last[3], last[0])
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+# --- Search Transcriptions ---
+@app.route('/api/transcriptions/search', methods=['GET'])
+@token_required
+def search_transcriptions(current_user_id):
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Search query is required'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', LIST_PAGE_SIZE)), 1), LIST_MAX_PAGE_SIZE)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit or offset'}), 400
+
+    with db_cursor() as cur:
+        # Rank over the GIN index first; only the returned page pays for
+        # ts_headline, which has to re-parse the document text.
+        cur.execute("""
+            SELECT af.id, af.original_filename, af.status, af.uploaded_at, hits.rank,
+                   ts_headline('english', COALESCE(af.summary, '') || ' ' || COALESCE(af.transcript, ''), hits.query,
+                               'StartSel=[[, StopSel=]], MaxFragments=2, MaxWords=20, MinWords=5, FragmentDelimiter=" ... "')
+            FROM (
+                SELECT id, ts_rank_cd(search_vector, query) AS rank, query
+                FROM audio_files, websearch_to_tsquery('english', %s) AS query
+                WHERE user_id = %s AND search_vector @@ query
+                ORDER BY rank DESC, id DESC
+                LIMIT %s OFFSET %s
+            ) AS hits
+            JOIN audio_files af ON af.id = hits.id
+            ORDER BY hits.rank DESC, af.id DESC
+        """, (query, current_user_id, limit + 1, offset))
+        rows = cur.fetchall()
+
+    has_more = len(rows) > limit
+    items = [{
+        'id': r[0],
+        'title': r[1],
+        'status': r[2],
+        'date': r[3].strftime('%Y-%m-%d %H:%M:%S') if r[3] else None,
+        'rank': round(float(r[4]), 4),
+        'highlight': r[5]
+    } for r in rows[:limit]]
+    return jsonify({
+        'items': items,
+        'next_offset': offset + limit if has_more else None
+    })
 
 # --- Delete ALL Transcriptions for current user ---
 @app.route('/api/transcriptions', methods=['DELETE'])
 @token_required
 def delete_all_transcriptions(current_user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute("""
-            DELETE FROM audio_files
-            WHERE user_id = %s
-        """, (current_user_id,))
-        conn.commit()
+        with db_cursor() as cur:
+            cur.execute("""
+                DELETE FROM audio_files
+                WHERE user_id = %s
+                RETURNING id, filename, content_sha256
+            """, (current_user_id,))
+            deleted = cur.fetchall()
+            blobs.release_for_rows(cur, app.config['UPLOAD_FOLDER'], [row[1:] for row in deleted])
+        exports.purge(app.config['EXPORT_CACHE_DIR'], [row[0] for row in deleted])
         return jsonify({'message': 'All transcriptions deleted successfully'})
     except Exception as e:
-        conn.rollback()
         return jsonify({'message': 'Failed to delete all transcriptions', 'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
 
 # --- Get Single Transcription ---
 @app.route('/api/transcriptions/<int:transcription_id>', methods=['GET'])
 @token_required
 def get_transcription(current_user_id, transcription_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
+    with db_cursor() as cur:
         cur.execute("""
-            SELECT id, original_filename, status, uploaded_at, transcript, summary
+            SELECT id, original_filename, status, uploaded_at, transcript, summary, progress, duration_seconds, filename
             FROM audio_files 
             WHERE id = %s AND user_id = %s
         """, (transcription_id, current_user_id))
         transcription = cur.fetchone()
         
-        if not transcription:
-            return jsonify({'message': 'Transcription not found'}), 404
-            
-        return jsonify({
-            'id': transcription[0],
-            'title': transcription[1],
-            'status': transcription[2],
-            'date': transcription[3].strftime('%Y-%m-%d %H:%M:%S') if transcription[3] else None,
-            'transcript': transcription[4],
-            'summary': transcription[5]
-        })
-    finally:
-        cur.close()
-        conn.close()
+        transcript = transcription[4] if transcription else None
+        partial = False
+        if transcription and transcription[2] == 'processing':
+            # Still running: serve the text of the windows finished so far
+            cur.execute("""
+                SELECT string_agg(text, ' ' ORDER BY seq)
+                FROM transcript_segments
+                WHERE audio_file_id = %s
+            """, (transcription_id,))
+            transcript = cur.fetchone()[0]
+            partial = True
+    
+    if not transcription:
+        return jsonify({'message': 'Transcription not found'}), 404
+        
+    return jsonify({
+        'id': transcription[0],
+        'title': transcription[1],
+        'status': transcription[2],
+        'date': transcription[3].strftime('%Y-%m-%d %H:%M:%S') if transcription[3] else None,
+        'transcript': transcript,
+        'summary': transcription[5],
+        'progress': transcription[6],
+        'duration': transcription[7],
+        'audio_url': f"/uploads/{transcription[8]}",
+        'partial': partial
+    })
 
 # --- Delete Single Transcription ---
 @app.route('/api/transcriptions/<int:transcription_id>', methods=['DELETE'])
 @token_required
 def delete_transcription(current_user_id, transcription_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        # Ensure it belongs to the current user
-        cur.execute("""
-            DELETE FROM audio_files
-            WHERE id = %s AND user_id = %s
-            RETURNING id
-        """, (transcription_id, current_user_id))
-        deleted = cur.fetchone()
+        with db_cursor() as cur:
+            # Ensure it belongs to the current user
+            cur.execute("""
+                DELETE FROM audio_files
+                WHERE id = %s AND user_id = %s
+                RETURNING filename, content_sha256
+            """, (transcription_id, current_user_id))
+            deleted = cur.fetchone()
+            if deleted:
+                blobs.release_for_rows(cur, app.config['UPLOAD_FOLDER'], [deleted])
         if not deleted:
-            conn.rollback()
             return jsonify({'message': 'Transcription not found'}), 404
-        conn.commit()
+        exports.purge(app.config['EXPORT_CACHE_DIR'], [transcription_id])
         return jsonify({'message': 'Transcription deleted successfully'})
     except Exception as e:
-        conn.rollback()
         return jsonify({'message': 'Failed to delete transcription', 'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
+
+EXPORT_RETRY_AFTER = 2  # seconds; how soon a client should retry a download that is still being prepared
+
+def _send_export(path, format, filename_base, tag):
+    # send_file streams the file and handles Range and If-None-Match/If-Range
+    response = send_file(
+        path,
+        mimetype=exports.FORMATS[format],
+        as_attachment=True,
+        download_name=f"{filename_base}_transcript.{format}",
+        etag=tag,
+        conditional=True,
+        max_age=0
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
 
 # --- Download Transcription Route (with format and summary) ---
 @app.route('/api/transcriptions/<int:transcription_id>/download', methods=['GET'])
 @token_required
 def download_transcription(current_user_id, transcription_id):
-    try:
-        from transformers import pipeline
-        summarizer = pipeline('summarization', model='facebook/bart-large-cnn')
-    except Exception:
-        summarizer = None
-    try:
-        from deep_translator import GoogleTranslator
-    except Exception:
-        GoogleTranslator = None
-
+    # Exports are produced by the post-transcription pipeline (pipeline.py);
+    # this route only serves the rendered file, or schedules the missing
+    # stages and answers 202 so the client retries.
     format = request.args.get('format', 'txt').lower()
-    lang = request.args.get('lang', 'en')
+    lang = request.args.get('lang', translation.TRANSLATION_SOURCE_LANG)
+    if format not in exports.FORMATS:
+        format = 'txt'
+    # lang becomes part of a stage key, a job payload and a cache file name
+    if lang not in pipeline.SUPPORTED_LANGUAGES:
+        return jsonify({'message': f"Unsupported language. Supported: {', '.join(sorted(pipeline.SUPPORTED_LANGUAGES))}"}), 400
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
+    with db_cursor() as cur:
         cur.execute("""
-            SELECT original_filename, transcript, status
+            SELECT original_filename, transcript, status, summary
             FROM audio_files 
             WHERE id = %s AND user_id = %s
         """, (transcription_id, current_user_id))
         transcription = cur.fetchone()
-        
-        if not transcription:
+    
+    if not transcription:
+        return jsonify({'message': 'Transcription not found'}), 404
+    
+    if transcription[2] != 'completed':
+        return jsonify({'message': 'Transcription not completed yet'}), 400
+    
+    filename_base = transcription[0]
+    key = pipeline.stage_key('render', format, lang)
+    if transcription[3] is not None:
+        digest = exports.content_hash(filename_base, transcription[3], transcription[1])
+        tag = exports.etag(transcription_id, format, lang, digest)
+        if tag in request.if_none_match:
+            return Response(status=304, headers={'ETag': f'"{tag}"'})
+        path = exports.cache_path(app.config['EXPORT_CACHE_DIR'], transcription_id, format, lang, digest)
+        if exports.lookup(path):
+            return _send_export(path, format, filename_base, tag)
+
+    with db_cursor() as cur:
+        stage_status, artifact = pipeline.state(cur, transcription_id, key)
+        failed = pipeline.failed_stage(cur, transcription_id, key)
+        fallback = stage_status == 'completed' and artifact.get('untranslated') and exports.lookup(artifact['path'])
+        # A failed stage (its job already used up its retries) blocks the
+        # export; it is only scheduled again when the client asks with ?retry=1
+        if not fallback and failed and request.args.get('retry') != '1':
+            return jsonify({'message': 'Export failed', 'stage': failed[0], 'error': failed[1]}), 500
+        if not fallback and (failed or stage_status not in ('pending', 'queued', 'running')):
+            pipeline.request(cur, transcription_id, [key])
+            stage_status = 'queued'
+    if fallback:
+        # No translation backend was available; serve the original text
+        return _send_export(artifact['path'], format, filename_base, artifact['etag'])
+    response = jsonify({'message': 'Export is being prepared', 'stage': key, 'status': stage_status})
+    response.headers['Retry-After'] = str(EXPORT_RETRY_AFTER)
+    return response, 202
+
+# --- Pipeline Stage Timings ---
+@app.route('/api/transcriptions/<int:transcription_id>/stages', methods=['GET'])
+@token_required
+def get_transcription_stages(current_user_id, transcription_id):
+    with db_cursor() as cur:
+        cur.execute("SELECT 1 FROM audio_files WHERE id = %s AND user_id = %s", (transcription_id, current_user_id))
+        if not cur.fetchone():
             return jsonify({'message': 'Transcription not found'}), 404
-        
-        if transcription[2] != 'completed':
-            return jsonify({'message': 'Transcription not completed yet'}), 400
-        
-        transcript = transcription[1]
-        summary = None
-        # Summarize if possible
-        if summarizer:
-            try:
-                summary = summarizer(transcript, max_length=60, min_length=20, do_sample=False)[0]['summary_text']
-            except Exception:
-                summary = None
-        if not summary:
-            summary = transcript[:200] + ('...' if len(transcript) > 200 else '')
-        
-        # Translate if needed
-        lang_map = {
-            'en': 'english', 'hi': 'hindi', 'ja': 'japanese', 'ko': 'korean', 'zh': 'chinese',
-            'es': 'spanish', 'de': 'german', 'ru': 'russian', 'co': 'colombian spanish'
-        }
-        if lang != 'en' and GoogleTranslator:
-            try:
-                transcript = GoogleTranslator(source='auto', target=lang).translate(transcript)
-                summary = GoogleTranslator(source='auto', target=lang).translate(summary)
-            except Exception:
-                pass
-        
-        filename_base = transcription[0]
-        if format == 'pdf':
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 10, f'Transcription of: {filename_base}', ln=True)
-            pdf.set_font('Arial', '', 12)
-            pdf.multi_cell(0, 10, f'Summary:\n{summary}\n\nTranscript:\n{transcript}')
-            pdf_bytes = pdf.output(dest='S').encode('latin1')
-            return Response(pdf_bytes, mimetype='application/pdf', headers={
-                'Content-Disposition': f'attachment; filename="{filename_base}_transcript.pdf"'
-            })
-        elif format == 'docx':
-            doc = Document()
-            doc.add_heading(f'Transcription of: {filename_base}', 0)
-            doc.add_heading('Summary', level=1)
-            doc.add_paragraph(summary)
-            doc.add_heading('Transcript', level=1)
-            doc.add_paragraph(transcript)
-            f = io.BytesIO()
-            doc.save(f)
-            f.seek(0)
-            return Response(f.read(), mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document', headers={
-                'Content-Disposition': f'attachment; filename="{filename_base}_transcript.docx"'
-            })
+        stages = pipeline.timings(cur, transcription_id)
+    return jsonify({'stages': stages})
+
+SEGMENT_PAGE_SIZE = 200
+SEGMENT_MAX_PAGE_SIZE = 1000
+
+# --- Transcript Segments (time range or page) ---
+@app.route('/api/transcriptions/<int:transcription_id>/segments', methods=['GET'])
+@token_required
+def get_transcription_segments(current_user_id, transcription_id):
+    try:
+        limit = min(max(int(request.args.get('limit', SEGMENT_PAGE_SIZE)), 1), SEGMENT_MAX_PAGE_SIZE)
+        after_seq = int(request.args.get('after_seq', -1))
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start_ms = int(float(start) * 1000) if start is not None else None
+        end_ms = int(float(end) * 1000) if end is not None else None
+    except (ValueError, OverflowError):  # OverflowError: ?start=inf
+        return jsonify({'message': 'Invalid start, end, after_seq or limit'}), 400
+
+    with db_cursor() as cur:
+        cur.execute("SELECT 1 FROM audio_files WHERE id = %s AND user_id = %s", (transcription_id, current_user_id))
+        if not cur.fetchone():
+            return jsonify({'message': 'Transcription not found'}), 404
+        if start_ms is None and end_ms is None:
+            cur.execute("""
+                SELECT seq, start_ms, end_ms, text, speaker
+                FROM transcript_segments
+                WHERE audio_file_id = %s AND seq > %s
+                ORDER BY seq
+                LIMIT %s
+            """, (transcription_id, after_seq, limit + 1))
         else:
-            content = f"Transcription of: {filename_base}\n\nSummary:\n{summary}\n\nTranscript:\n{transcript}"
-            return Response(content, mimetype='text/plain', headers={
-                'Content-Disposition': f'attachment; filename="{filename_base}_transcript.txt"'
-            })
-    finally:
-        cur.close()
-        conn.close()
+            # Segments overlapping [start, end). Both bounds are ranges on the
+            # (audio_file_id, start_ms) index: the scan begins at the last
+            # segment starting before `start`, the one that may still be playing.
+            start_ms = max(start_ms or 0, 0)
+            cur.execute("""
+                SELECT seq, start_ms, end_ms, text, speaker
+                FROM transcript_segments
+                WHERE audio_file_id = %s
+                  AND start_ms >= COALESCE((
+                      SELECT max(start_ms) FROM transcript_segments
+                      WHERE audio_file_id = %s AND start_ms <= %s
+                  ), 0)
+                  AND (%s IS NULL OR start_ms < %s)
+                  AND end_ms > %s
+                  AND seq > %s
+                ORDER BY start_ms, seq
+                LIMIT %s
+            """, (transcription_id, transcription_id, start_ms, end_ms, end_ms, start_ms, after_seq, limit + 1))
+        rows = cur.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({
+        'segments': [{
+            'seq': r[0],
+            'start': r[1] / 1000,
+            'end': r[2] / 1000,
+            'text': r[3],
+            'speaker': r[4]
+        } for r in rows],
+        'next_seq': rows[-1][0] if more else None
+    })
+
+# --- Subtitles (SRT / WebVTT) generated from the segments ---
+@app.route('/api/transcriptions/<int:transcription_id>/subtitles', methods=['GET'])
+@token_required
+def download_subtitles(current_user_id, transcription_id):
+    format = request.args.get('format', 'srt').lower()
+    if format not in subtitles.FORMATS:
+        return jsonify({'message': 'Unsupported subtitle format'}), 400
+
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT original_filename, status
+            FROM audio_files
+            WHERE id = %s AND user_id = %s
+        """, (transcription_id, current_user_id))
+        audio_file = cur.fetchone()
+        if audio_file and audio_file[1] == 'completed':
+            cur.execute("""
+                SELECT start_ms, end_ms, text, speaker
+                FROM transcript_segments
+                WHERE audio_file_id = %s
+                ORDER BY seq
+            """, (transcription_id,))
+            rows = cur.fetchall()
+
+    if not audio_file:
+        return jsonify({'message': 'Transcription not found'}), 404
+    if audio_file[1] != 'completed':
+        return jsonify({'message': 'Transcription not completed yet'}), 400
+
+    # The rows are fetched up front so the connection goes back to the pool
+    # before the (possibly slow) client reads the response
+    response = Response(subtitles.render(rows, format), mimetype=subtitles.FORMATS[format])
+    filename_base = secure_filename(audio_file[0]) or 'transcription'
+    response.headers.set('Content-Disposition', 'attachment', filename=f"{filename_base}_transcript.{format}")
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# --- Job Status Events (server-sent events) ---
+@app.route('/api/events', methods=['GET'])
+@stream_token_required
+def job_events(current_user_id):
+    return Response(stream_with_context(events.sse_stream(current_user_id)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# --- Model Registry Stats ---
+@app.route('/api/models/stats', methods=['GET'])
+@token_required
+def get_model_stats(current_user_id):
+    stats = model_registry.registry.stats()
+    stats['summarizer'] = summarizer.stats()
+    stats['batcher'] = batching.batcher.stats()
+    stats['translator'] = translation.stats()
+    return jsonify(stats)
+
+# --- Database Pool Stats ---
+@app.route('/api/db/stats', methods=['GET'])
+@token_required
+def get_db_stats(current_user_id):
+    return jsonify(pool_stats())
+
+# --- Prometheus Metrics ---
+_pool_gauge = metrics.gauge('voicevista_db_pool_connections', 'Database pool connections by state', ('state',))
+_pool_timeouts = metrics.gauge('voicevista_db_pool_timeouts', 'Checkouts that gave up waiting for a connection')
+_models_memory = metrics.gauge('voicevista_model_memory_bytes', 'Estimated memory of the loaded models')
+
+@metrics.collector
+def _collect_process_stats():
+    stats = pool_stats()
+    _pool_gauge.set(stats['checked_out'], state='checked_out')
+    _pool_gauge.set(stats['idle'], state='idle')
+    _pool_timeouts.set(stats['timeouts'])
+    _models_memory.set(model_registry.registry.stats()['memory_used_bytes'])
+
+# Unauthenticated, like most scrape targets; keep it off the public proxy
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 # --- Serve Uploaded Files (Profile DP, Audio, etc.) ---
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
+def _recover_orphaned_upload(cur, file_id, filename):
+    # Rows left in 'processing' by a crash or by the old thread-per-upload code.
+    # Re-queue them unless the audio is gone or a job for them already failed.
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    cur.execute("SELECT 1 FROM jobs WHERE audio_file_id = %s AND status = 'failed'", (file_id,))
+    if cur.fetchone() or not os.path.exists(file_path):
+        cur.execute("UPDATE audio_files SET status = 'failed' WHERE id = %s", (file_id,))
+        print(f"Marked orphaned upload {file_id} as failed")
+    else:
+        jobs.enqueue(cur, 'transcribe', file_id, {'file_path': file_path}, enforce_limit=False)
+        print(f"Re-queued orphaned upload {file_id}")
+
+# Processes spawned by this one (process-mode job workers, the parallel
+# transcription pool) re-import the main module as __mp_main__; they must not
+# start a worker pool or warm models of their own.
+_SPAWNED_CHILD = __name__ == '__mp_main__' or multiprocessing.current_process().daemon
+
+# Start the transcription worker pool. Run web processes with
+# START_JOB_WORKERS=0 when workers are deployed separately (python worker.py).
+if os.getenv('START_JOB_WORKERS', '1') == '1' and not _SPAWNED_CHILD:
+    try:
+        db_pool.fill()
+        jobs.recover_orphans(_recover_orphaned_upload)
+    except Exception as e:
+        print(f"Job recovery failed: {str(e)}")
+    jobs.start_workers('tasks')
+
+# Warm the default Whisper model in the background so the first upload
+# doesn't pay the checkpoint load.
+if os.getenv('WARM_MODELS', '1') == '1' and not _SPAWNED_CHILD:
+    threading.Thread(target=model_registry.warm_default_models, daemon=True).start()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,170 @@
+# backend/auth.py
+# Authentication hot path. Tokens carry an expiry; verified tokens and each
+# user's profile/settings row are kept in small bounded TTL caches so most
+# requests skip both the JWT signature check and the users/user_settings
+# join. Caches are per process: a profile update invalidates the local
+# entry, other processes pick it up within AUTH_CACHE_TTL.
+#
+# Password hashing (deliberately slow) runs on a small dedicated thread
+# pool. The request thread still waits for its own result, so a check only
+# starts when a pool thread is free: nothing queues behind the pool, at most
+# AUTH_HASH_WORKERS request threads are ever busy hashing, and otherwise
+# login and register answer 503 at once, leaving the rest of the request
+# threads for status polls and downloads.
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import metrics
+from db import db_cursor
+
+JWT_EXPIRES_HOURS = float(os.getenv('JWT_EXPIRES_HOURS', '24'))
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))  # entries per cache
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '300'))  # seconds
+AUTH_HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', '2'))  # concurrent checks; 503 beyond
+
+_cache_requests = metrics.counter(
+    'voicevista_auth_cache_requests_total', 'Auth cache lookups by cache and result (hit or miss)', ('cache', 'result')
+)
+
+
+class AuthBusy(Exception):
+    pass
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire."""
+
+    def __init__(self, name, max_size, ttl):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at monotonic)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                _cache_requests.inc(cache=self.name, result='hit')
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+        _cache_requests.inc(cache=self.name, result='miss')
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_claims = TTLCache('claims', AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+_profiles = TTLCache('profile', AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+_hash_pool = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix='auth-hash')
+_hash_slots = threading.BoundedSemaphore(AUTH_HASH_WORKERS)
+
+
+# --- Tokens ---
+
+def issue_token(user_id, secret):
+    """Signed token for user_id. Returns (token, expires_at datetime)."""
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(hours=JWT_EXPIRES_HOURS)
+    token = jwt.encode({'user_id': user_id, 'iat': now, 'exp': expires_at}, secret, algorithm='HS256')
+    return token, expires_at
+
+
+def verify_token(token, secret):
+    """user_id from a token, from the cache when it was verified recently.
+
+    Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError like jwt.decode;
+    tokens without an expiry are rejected.
+    """
+    cached = _claims.get(token)
+    if cached is not None:
+        user_id, exp = cached
+        if exp > time.time():
+            return user_id
+        _claims.pop(token)
+        raise jwt.ExpiredSignatureError('Signature has expired')
+    data = jwt.decode(token, secret, algorithms=['HS256'], options={'require': ['exp']})
+    user_id = data['user_id']
+    _claims.set(token, (user_id, data['exp']), ttl=data['exp'] - time.time())
+    return user_id
+
+
+# --- Profile and settings ---
+
+def user_profile(user_id):
+    """{'id', 'name', 'email', 'avatar_url', 'created_at', 'settings': {...}} for
+    user_id, or None. Callers must not modify the returned dict."""
+    profile = _profiles.get(user_id)
+    if profile is not None:
+        return profile
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT u.id, u.name, u.email, u.avatar_url, u.created_at,
+                   us.transcription_language, us.voice_diarization, us.export_format, us.model_size
+            FROM users u
+            LEFT JOIN user_settings us ON u.id = us.user_id
+            WHERE u.id = %s
+        """, (user_id,))
+        row = cur.fetchone()
+    if not row:
+        return None
+    profile = {
+        'id': row[0],
+        'name': row[1],
+        'email': row[2],
+        'avatar_url': row[3],
+        'created_at': row[4],
+        'settings': {
+            'transcription_language': row[5],
+            'voice_diarization': row[6],
+            'export_format': row[7],
+            'model_size': row[8],
+        },
+    }
+    _profiles.set(user_id, profile)
+    return profile
+
+
+def invalidate_user(user_id):
+    _profiles.pop(user_id)
+
+
+# --- Password hashing ---
+
+def _run_hash(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise AuthBusy('Too many logins in progress')
+    try:
+        return _hash_pool.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
+
+
+def check_password(password_hash, password):
+    return _run_hash(check_password_hash, password_hash, password)
+
+
+def hash_password(password):
+    return _run_hash(generate_password_hash, password)
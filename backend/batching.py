@@ -0,0 +1,170 @@
+# backend/batching.py
+# Micro-batched decoding for short clips. Worker threads that pick up a clip
+# of at most one Whisper window (30 s) submit it here instead of running the
+# model themselves; a dispatcher thread collects clips for up to
+# BATCH_WINDOW_MS (or until BATCH_MAX_SIZE are waiting), pads them into one
+# mel batch and runs a single batched decode. Each caller gets its own result
+# back through a Future.
+#
+# Batches are formed from the clips in flight in this process, so the batch
+# size is bounded by the number of worker threads (JOB_WORKERS); it has no
+# effect with JOB_WORKER_MODE=process.
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import model_registry
+import preprocessing
+
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '8'))  # 1 disables batching
+BATCH_WINDOW_MS = int(os.getenv('BATCH_WINDOW_MS', '50'))
+BATCH_MAX_CLIP_SECONDS = 30  # one Whisper window; longer audio takes the windowed path
+TIMESTAMP_SECONDS = 0.02  # resolution of Whisper's timestamp tokens
+
+
+def _segments_from_tokens(model, result, duration):
+    """Turn a DecodingResult's <|t|> text <|t|> token stream into segments."""
+    from whisper.tokenizer import get_tokenizer
+    tokenizer = get_tokenizer(
+        model.is_multilingual, num_languages=model.num_languages, language=result.language, task='transcribe'
+    )
+    timestamp_begin = tokenizer.timestamp_begin
+    segments = []
+    start, text_tokens = None, []
+
+    def close(end):
+        text = tokenizer.decode(text_tokens).strip()
+        if text:
+            segments.append({'start': start or 0.0, 'end': min(end, duration), 'text': text})
+
+    for token in result.tokens:
+        if token < timestamp_begin:
+            text_tokens.append(token)
+            continue
+        t = (token - timestamp_begin) * TIMESTAMP_SECONDS
+        if start is not None and text_tokens:
+            close(t)
+            start, text_tokens = None, []
+        else:
+            start = t
+    if text_tokens:
+        close(duration)
+    return segments
+
+
+def decode_batch(model, clips, fp16=False):
+    """Transcribe up to 30 s clips (16 kHz float32) in one forward pass.
+    Returns a list of segment lists, one per clip."""
+    import torch
+    import whisper
+
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(np.array(clip, dtype=np.float32))),
+                                    model.dims.n_mels)
+        for clip in clips
+    ]).to(model.device)
+    if fp16:
+        mels = mels.half()
+    results = whisper.decode(model, mels, whisper.DecodingOptions(fp16=fp16))
+
+    out = []
+    for clip, result in zip(clips, results):
+        # Same no-speech rule as whisper.transcribe
+        if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+            out.append([])
+        else:
+            out.append(_segments_from_tokens(model, result, len(clip) / preprocessing.SAMPLE_RATE))
+    return out
+
+
+class MicroBatcher:
+    def __init__(self, max_size, window_ms):
+        self.max_size = max_size
+        self.window = window_ms / 1000
+        self._pending = queue.Queue()
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._clips = 0
+        self._audio_seconds = 0.0
+        self._decode_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._size_histogram = {}
+
+    def submit(self, clip, fp16=False, model_name=None):
+        future = Future()
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_forever, daemon=True)
+                self._dispatcher.start()
+        self._pending.put((clip, (model_name or model_registry.WHISPER_MODEL, fp16), future, time.monotonic()))
+        return future
+
+    def transcribe(self, clip, fp16=False, model_name=None):
+        return self.submit(clip, fp16, model_name).result()
+
+    def _collect(self):
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch_forever(self):
+        while True:
+            batch = self._collect()
+            # Model and precision are properties of the batch; split if callers disagree
+            for key in {item[1] for item in batch}:
+                self._run([item for item in batch if item[1] == key], *key)
+
+    def _run(self, batch, model_name, fp16):
+        started = time.monotonic()
+        try:
+            with model_registry.whisper_model(model_name) as model:
+                results = decode_batch(model, [item[0] for item in batch], fp16)
+        except Exception as e:
+            for item in batch:
+                item[2].set_exception(e)
+            return
+        finished = time.monotonic()
+        for item, segments in zip(batch, results):
+            item[2].set_result(segments)
+        with self._lock:
+            self._batches += 1
+            self._clips += len(batch)
+            self._audio_seconds += sum(len(item[0]) for item in batch) / preprocessing.SAMPLE_RATE
+            self._decode_seconds += finished - started
+            self._wait_seconds += sum(started - item[3] for item in batch)
+            self._size_histogram[len(batch)] = self._size_histogram.get(len(batch), 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'window_ms': int(self.window * 1000),
+                'batches': self._batches,
+                'clips': self._clips,
+                'avg_batch_size': round(self._clips / self._batches, 2) if self._batches else 0,
+                'batch_sizes': dict(sorted(self._size_histogram.items())),
+                'avg_wait_ms': round(self._wait_seconds * 1000 / self._clips, 1) if self._clips else 0,
+                'clips_per_decode_second': round(self._clips / self._decode_seconds, 2) if self._decode_seconds else 0,
+                'audio_seconds_per_decode_second': round(self._audio_seconds / self._decode_seconds, 2) if self._decode_seconds else 0,
+                'pending': self._pending.qsize(),
+            }
+
+
+batcher = MicroBatcher(BATCH_MAX_SIZE, BATCH_WINDOW_MS)
+
+
+def eligible(audio):
+    return BATCH_MAX_SIZE > 1 and 0 < len(audio) <= BATCH_MAX_CLIP_SECONDS * preprocessing.SAMPLE_RATE
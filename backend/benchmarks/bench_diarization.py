@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_diarization.py
+# Cost of the diarization stage per minute of audio. Runs on real recordings,
+# or with --synthetic on generated audio where two "speakers" (different
+# pitch and timbre) alternate, which also checks that they are told apart.
+# No database needed; segments are fixed 5 s slices of the audio.
+#
+#   python benchmarks/bench_diarization.py meeting.mp3 call.m4a
+#   python benchmarks/bench_diarization.py --synthetic 30
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import diarization  # noqa: E402
+import preprocessing  # noqa: E402
+
+SEGMENT_SECONDS = 5
+
+
+def synthetic(minutes, turn_seconds=7, seed=0):
+    """Two alternating harmonic voices with pauses; returns (audio, true speaker per segment)."""
+    rng = np.random.default_rng(seed)
+    sr = preprocessing.SAMPLE_RATE
+    voices = [(120, [1.0, 0.6, 0.3, 0.2]), (210, [1.0, 0.2, 0.5, 0.1])]
+    pieces = []
+    t = 0.0
+    turns = []
+    speaker = 0
+    while t < minutes * 60:
+        f0, harmonics = voices[speaker]
+        n = int(turn_seconds * sr)
+        time_axis = np.arange(n) / sr
+        pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * time_axis))  # slow vibrato
+        phase = 2 * np.pi * np.cumsum(pitch) / sr
+        voice = sum(a * np.sin((k + 1) * phase) for k, a in enumerate(harmonics))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * time_axis) ** 2  # syllable-like amplitude
+        pieces.append((0.1 * voice * envelope + rng.normal(0, 0.002, n)).astype(np.float32))
+        turns.append((t, t + turn_seconds, speaker))
+        pause = rng.normal(0, 0.002, int(0.8 * sr)).astype(np.float32)
+        pieces.append(pause)
+        t += turn_seconds + 0.8
+        speaker = 1 - speaker
+    return np.concatenate(pieces), turns
+
+
+def segments_for(audio):
+    duration = len(audio) / preprocessing.SAMPLE_RATE
+    return [{'start': s, 'end': min(s + SEGMENT_SECONDS, duration)} for s in np.arange(0, duration, SEGMENT_SECONDS)]
+
+
+def run(name, audio, turns=None):
+    segments = segments_for(audio)
+    started = time.perf_counter()
+    speakers, stats = diarization.diarize(audio, segments)
+    seconds = time.perf_counter() - started
+    minutes = len(audio) / preprocessing.SAMPLE_RATE / 60
+    line = (f"{name:<28}{minutes:>8.1f}{seconds:>10.2f}{seconds / minutes:>12.3f}"
+            f"{stats['windows']:>9}{stats['speakers']:>10}")
+    if turns is not None:
+        # Agreement with the true speaker at each segment midpoint (labels may be swapped)
+        truth = []
+        for seg in segments:
+            middle = (seg['start'] + seg['end']) / 2
+            truth.append(next((s for start, end, s in turns if start <= middle < end + 0.8), 0))
+        found = np.array([-1 if s is None else s for s in speakers])
+        truth = np.array(truth)
+        accuracy = max((found == truth).mean(), (found == 1 - truth).mean())
+        line += f"{accuracy:>10.0%}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the diarization stage (seconds per audio minute)')
+    parser.add_argument('audio', nargs='*')
+    parser.add_argument('--synthetic', type=float, metavar='MINUTES', help='also run on generated two-speaker audio')
+    args = parser.parse_args()
+    if not args.audio and not args.synthetic:
+        parser.error('give audio files and/or --synthetic MINUTES')
+
+    print(f"{'input':<28}{'minutes':>8}{'seconds':>10}{'s/audio-min':>12}{'windows':>9}{'speakers':>10}{'accuracy':>10}")
+    if args.synthetic:
+        audio, turns = synthetic(args.synthetic)
+        run(f"synthetic ({args.synthetic:g} min)", audio, turns)
+    for path in args.audio:
+        run(os.path.basename(path)[:27], np.asarray(preprocessing.load_pcm(path)))
+
+
+if __name__ == '__main__':
+    main()
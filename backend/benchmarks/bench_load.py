@@ -0,0 +1,327 @@
+# backend/benchmarks/bench_load.py
+# Load test of the upload -> transcribe -> download path, fully offline.
+#
+# The app runs in this process (Flask test client, in-process job workers)
+# against the local Postgres in DATABASE_URL. Whisper and the summarizer are
+# replaced by stub models registered with the model registry, so nothing is
+# downloaded and the run measures the service around the model: ingest,
+# queueing, database, VAD, pipeline stages and export rendering. The stub
+# Whisper can be given a fixed real-time factor (--stub-rtf) to simulate
+# model cost. Every upload is a freshly synthesized WAV (random tones and
+# pauses), so uploads never hit the transcription result cache unless
+# --same-audio is given.
+#
+# Each client thread repeats: POST /api/upload, poll GET /api/transcriptions/<id>
+# until completed (listing GET /api/transcriptions on the way), then GET
+# /download until the export is served. Reports p50/p95/p99 per endpoint,
+# end-to-end times, jobs/min and peak RSS, and writes them to --output as
+# JSON (with the git commit) for comparing runs.
+#
+# Needs DATABASE_URL with an initialized schema (python db.py), plus
+# openai-whisper and ffmpeg for decoding. Uploads and exports go to a
+# temporary directory; the throwaway user and its rows are deleted afterwards.
+#
+#   python benchmarks/bench_load.py --uploads 40 --concurrency 8 --workers 4 --duration 20 --output results.json
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+SAMPLE_RATE = 16000
+WORDS = ('audio', 'meeting', 'budget', 'review', 'schedule', 'project', 'customer', 'release', 'update', 'team')
+
+
+# --- Stub models ---
+
+class StubWhisper:
+    """Answers like whisper's model.transcribe: one segment per ~4s of input."""
+
+    def __init__(self, rtf):
+        self.rtf = rtf
+
+    def transcribe(self, audio, **options):
+        seconds = len(audio) / SAMPLE_RATE
+        if self.rtf:
+            time.sleep(seconds * self.rtf)
+        rng = random.Random(len(audio))
+        segments = []
+        for start in np.arange(0, seconds, 4.0):
+            text = ' '.join(rng.choice(WORDS) for _ in range(8)).capitalize() + '.'
+            segments.append({'start': float(start), 'end': float(min(start + 4.0, seconds)), 'text': ' ' + text})
+        return {'text': ''.join(s['text'] for s in segments), 'segments': segments}
+
+
+class StubTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, ids):
+        return ' '.join(ids)
+
+
+class StubSummarizer:
+    tokenizer = StubTokenizer()
+
+    def __call__(self, texts, max_length=60, **options):
+        return [{'summary_text': ' '.join(text.split()[:max_length])} for text in texts]
+
+
+# --- Synthetic audio ---
+
+def synth_wav(seconds, seed):
+    """16 kHz mono 16-bit WAV bytes: tone bursts from two 'speakers' with pauses."""
+    rng = np.random.default_rng(seed)
+    pieces = []
+    total = 0
+    voices = rng.uniform(110, 260, size=2)
+    while total < seconds * SAMPLE_RATE:
+        burst = int(rng.uniform(1.0, 3.5) * SAMPLE_RATE)
+        t = np.arange(burst) / SAMPLE_RATE
+        f0 = voices[rng.integers(2)]
+        tone = sum(np.sin(2 * np.pi * f0 * h * t) / h for h in (1, 2, 3))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t) ** 2
+        pieces.append(0.2 * tone * envelope + rng.normal(0, 0.01, burst))
+        pause = int(rng.uniform(0.3, 1.2) * SAMPLE_RATE)
+        pieces.append(rng.normal(0, 0.002, pause))
+        total += burst + pause
+    audio = np.concatenate(pieces)[:int(seconds * SAMPLE_RATE)]
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buf.getvalue()
+
+
+# --- Measurements ---
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def call(self, name, fn):
+        started = time.perf_counter()
+        response = fn()
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            self.statuses[name][response.status_code] += 1
+        return response
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.latencies[name].append(seconds)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.mean(values) * 1000, 2) if values else None,
+        'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+        'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+        'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+        'max_ms': round(max(values) * 1000, 2) if values else None,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux; children covers JOB_WORKER_MODE=process
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+# --- Client flow ---
+
+def run_flow(app, token, args, recorder, index, deadline):
+    """One upload -> transcribe -> download flow; an exception is counted as
+    a failure of the stage it happened in instead of ending the run."""
+    progress = {'stage': 'upload'}
+    try:
+        return _flow(app, token, args, recorder, index, deadline, progress)
+    except Exception as e:
+        print(f"Flow {index} failed in {progress['stage']}: {type(e).__name__}: {str(e)}")
+        return {'ok': False, 'stage': progress['stage'], 'status': 'exception'}
+
+
+def _flow(app, token, args, recorder, index, deadline, progress):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    body = synth_wav(args.duration, 0 if args.same_audio else (args.seed, index))
+    flow_started = time.perf_counter()
+
+    while True:
+        response = recorder.call('upload', lambda: client.post('/api/upload', data=body, headers={
+            **headers, 'Content-Type': 'application/octet-stream', 'X-Filename': f'bench-{index}.wav'
+        }))
+        if response.status_code != 429:
+            break
+        time.sleep(float(response.headers.get('Retry-After', 1)))
+    if response.status_code != 201:
+        return {'ok': False, 'stage': 'upload', 'status': response.status_code}
+    file_id = response.get_json()['file_id']
+
+    progress['stage'] = 'transcribe'
+    polls = 0
+    while True:
+        response = recorder.call('status', lambda: client.get(f'/api/transcriptions/{file_id}', headers=headers))
+        status = response.get_json().get('status') if response.status_code == 200 else None
+        if status in ('completed', 'failed') or time.perf_counter() > deadline:
+            break
+        polls += 1
+        if polls % args.list_every == 0:
+            recorder.call('list', lambda: client.get('/api/transcriptions?limit=20', headers=headers))
+        time.sleep(args.poll_interval)
+    if status != 'completed':
+        return {'ok': False, 'stage': 'transcribe', 'status': status}
+    recorder.add('upload_to_completed', time.perf_counter() - flow_started)
+
+    progress['stage'] = 'download'
+    while True:
+        response = recorder.call('download', lambda: client.get(
+            f'/api/transcriptions/{file_id}/download?format={args.format}&lang=en', headers=headers
+        ))
+        if response.status_code != 202 or time.perf_counter() > deadline:
+            break
+        time.sleep(args.poll_interval)
+    if response.status_code != 200:
+        return {'ok': False, 'stage': 'download', 'status': response.status_code}
+    recorder.add('upload_to_download', time.perf_counter() - flow_started)
+    return {'ok': True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test of upload -> transcribe -> download')
+    parser.add_argument('--uploads', type=int, default=20, help='total upload flows')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads')
+    parser.add_argument('--workers', type=int, default=2, help='in-process job workers (JOB_WORKERS)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of synthetic audio per upload')
+    parser.add_argument('--stub-rtf', type=float, default=0.0, help='seconds the stub model spends per second of audio')
+    parser.add_argument('--format', default='txt', choices=('txt', 'pdf', 'docx'))
+    parser.add_argument('--diarization', action='store_true', help="turn the user's voice_diarization on")
+    parser.add_argument('--same-audio', action='store_true', help='upload identical audio (exercises the result cache)')
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--list-every', type=int, default=5, help='list transcriptions every N status polls')
+    parser.add_argument('--timeout', type=float, default=600, help='give up on flows after this many seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_load_results.json')
+    args = parser.parse_args()
+
+    # Configure the app before it is imported: in-process workers, no model
+    # warm-up, no micro-batching (the stub has no batched decode), quiet spans
+    os.environ['START_JOB_WORKERS'] = '1'
+    os.environ['JOB_WORKERS'] = str(args.workers)
+    os.environ['JOB_WORKER_MODE'] = 'thread'
+    os.environ['WARM_MODELS'] = '0'
+    os.environ['BATCH_MAX_SIZE'] = '1'
+    os.environ['TRANSCRIBE_PROCESSES'] = '0'
+    os.environ['TRACE_SPANS'] = '0'
+    os.environ['TRANSLATION_BACKENDS'] = ''
+
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='voicevista-bench-')
+    os.chdir(workdir)  # uploads/ and export_cache/ are relative to the working directory
+
+    import model_registry
+    import summarizer
+    model_registry.registry.register_loader('whisper', lambda name, device, precision: StubWhisper(args.stub_rtf))
+    model_registry.registry.register_loader('summarizer', lambda name, device, precision: StubSummarizer())
+    from app import app
+    from db import db_cursor
+
+    client = app.test_client()
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    client.post('/api/auth/register', json={'name': 'Load Bench', 'email': email, 'password': 'bench-password'})
+    token = client.post('/api/auth/login', json={'email': email, 'password': 'bench-password'}).get_json()['token']
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE user_settings SET voice_diarization = %s, export_format = %s, transcription_language = 'English'
+            WHERE user_id = (SELECT id FROM users WHERE email = %s)
+        """, (args.diarization, args.format, email))
+
+    print(f"{args.uploads} uploads of {args.duration:.0f}s audio, {args.concurrency} clients, "
+          f"{args.workers} workers, stub RTF {args.stub_rtf}")
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.timeout
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(lambda i: run_flow(app, token, args, recorder, i, deadline), range(args.uploads)))
+        wall = time.perf_counter() - started
+    finally:
+        client.delete('/api/transcriptions', headers={'Authorization': f'Bearer {token}'})
+        with db_cursor() as cur:
+            cur.execute("DELETE FROM users WHERE email = %s", (email,))
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    completed = sum(1 for o in outcomes if o['ok'])
+    failures = defaultdict(int)
+    for o in outcomes:
+        if not o['ok']:
+            failures[f"{o['stage']}:{o['status']}"] += 1
+    rss_self, rss_children = peak_rss_mb()
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'config': vars(args),
+        'wall_seconds': round(wall, 2),
+        'completed': completed,
+        'failures': dict(failures),
+        'jobs_per_minute': round(completed / wall * 60, 2) if wall else None,
+        'peak_rss_mb': rss_self,
+        'peak_rss_children_mb': rss_children,
+        'endpoints': {name: dict(summarize(values), statuses=dict(recorder.statuses.get(name, {})))
+                      for name, values in recorder.latencies.items()},
+        'summarizer': summarizer.stats(),
+    }
+
+    for name, r in results['endpoints'].items():
+        print(f"{name:<20} n={r['count']:<6} p50 {r['p50_ms']}ms  p95 {r['p95_ms']}ms  p99 {r['p99_ms']}ms")
+    print(f"{completed}/{args.uploads} completed in {wall:.1f}s: {results['jobs_per_minute']} jobs/min, "
+          f"peak RSS {rss_self} MB")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# backend/benchmarks/bench_parallel.py
+# Wall-clock time of one long recording transcribed in a single pass versus
+# split on silence across a process pool (parallel.py). Uses the same
+# preprocessing (decode + VAD) as the worker, and WHISPER_MODEL /
+# WHISPER_PRECISION from the environment. No database needed.
+#
+#   python benchmarks/bench_parallel.py meeting.mp3 --processes 4
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import model_registry  # noqa: E402
+import parallel  # noqa: E402
+import preprocessing  # noqa: E402
+import transcription  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-pass vs split-and-merge transcription')
+    parser.add_argument('audio')
+    parser.add_argument('--processes', type=int, default=max(2, parallel.CPU_COUNT // 4))
+    parser.add_argument('--skip-single', action='store_true', help='only run the parallel mode')
+    args = parser.parse_args()
+
+    audio, timeline = transcription.load_audio(args.audio)
+    speech_seconds = len(audio) / preprocessing.SAMPLE_RATE
+    print(f"{timeline.duration:.0f}s of audio, {speech_seconds:.0f}s after VAD")
+    fp16 = model_registry.WHISPER_PRECISION == 'fp16'
+    results = {}
+
+    if not args.skip_single:
+        with model_registry.whisper_model() as model:
+            started = time.perf_counter()
+            single = transcription.transcribe_incremental(model, audio, fp16=fp16, timeline=timeline)
+            results['single pass'] = (time.perf_counter() - started, len(single['segments']))
+
+    parallel.TRANSCRIBE_PROCESSES = args.processes
+    # Start the pool (and load a model in every process) outside the timed run
+    pool = parallel._get_pool()
+    list(pool.map(parallel._transcribe_part, [audio[:preprocessing.SAMPLE_RATE]] * args.processes,
+                  [fp16] * args.processes, [None] * args.processes, [{}] * args.processes))
+    split = parallel.transcribe_parallel(audio, fp16=fp16, timeline=timeline)
+    results[f"{args.processes} processes"] = (split['wall_seconds'], len(split['segments']))
+
+    baseline = results.get('single pass', (None,))[0]
+    print(f"\n{'mode':<16}{'wall s':>10}{'RTF':>8}{'speedup':>10}{'segments':>10}")
+    for name, (wall, segments) in results.items():
+        speedup = f"{baseline / wall:.2f}x" if baseline else '-'
+        print(f"{name:<16}{wall:>10.1f}{wall / timeline.duration:>8.3f}{speedup:>10}{segments:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# backend/benchmarks/bench_precision.py
+# Real-time factor and word error rate of Whisper model sizes / precisions on
+# a local fixture set, to pick the cost/accuracy point for CPU nodes.
+#
+# The fixture directory holds audio files with a reference transcript next to
+# each one under the same name (meeting.mp3 + meeting.txt). Audio goes through
+# the same preprocessing as the worker (decode + VAD). No database needed.
+#
+#   python benchmarks/bench_precision.py fixtures/ --models tiny,base,small --precisions fp32,int8 --threads 4
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import model_registry  # noqa: E402
+import transcription  # noqa: E402
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.flac', '.ogg')
+
+
+def normalize(text):
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance (substitutions + deletions + insertions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        reference_path = os.path.join(directory, stem + '.txt')
+        if ext.lower() in AUDIO_EXTENSIONS and os.path.exists(reference_path):
+            with open(reference_path, encoding='utf-8') as f:
+                reference = normalize(f.read())
+            audio, timeline = transcription.load_audio(os.path.join(directory, name))
+            fixtures.append((name, audio, timeline, reference))
+    return fixtures
+
+
+def run(fixtures, model_name, precision):
+    # Earlier models are evicted by the registry's memory budget as needed
+    started = time.perf_counter()
+    model = model_registry.registry.get('whisper', model_name, model_registry.WHISPER_DEVICE, precision)
+    load_seconds = time.perf_counter() - started
+
+    audio_seconds = decode_seconds = 0.0
+    errors = reference_words = 0
+    for _, audio, timeline, reference in fixtures:
+        started = time.perf_counter()
+        result = transcription.transcribe_incremental(model, audio, fp16=precision == 'fp16', timeline=timeline)
+        decode_seconds += time.perf_counter() - started
+        audio_seconds += timeline.duration
+        errors += word_errors(reference, normalize(result['text']))
+        reference_words += len(reference)
+
+    return {
+        'model': model_name,
+        'precision': precision,
+        'load_seconds': round(load_seconds, 2),
+        'decode_seconds': round(decode_seconds, 2),
+        'rtf': round(decode_seconds / audio_seconds, 4) if audio_seconds else None,
+        'wer': round(errors / reference_words, 4) if reference_words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Whisper model sizes and precisions (RTF and WER)')
+    parser.add_argument('fixtures', help='directory of audio files with same-named .txt references')
+    parser.add_argument('--models', default=','.join(model_registry.WHISPER_ALLOWED_MODELS))
+    parser.add_argument('--precisions', default='fp32,int8')
+    parser.add_argument('--threads', type=int, default=0, help='torch intra-op threads (0: torch default)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No audio files with matching .txt references in {args.fixtures}")
+    print(f"{len(fixtures)} fixture(s), {sum(t.duration for _, _, t, _ in fixtures):.0f}s of audio")
+
+    results = []
+    for model_name in args.models.split(','):
+        for precision in args.precisions.split(','):
+            results.append(run(fixtures, model_name.strip(), precision.strip()))
+            r = results[-1]
+            print(f"{r['model']:<10}{r['precision']:<6} RTF {r['rtf']:<8} WER {r['wer']:<8} "
+                  f"(load {r['load_seconds']}s, decode {r['decode_seconds']}s)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# backend/benchmarks/bench_transcriptions_list.py
+# Compares the old full-history listing query with the keyset-paginated,
+# snippet-only query behind GET /api/transcriptions.
+#
+# Seeds a throwaway user with --rows audio_files rows (default 10000) holding
+# realistic transcript/summary sizes, times both queries, and deletes the user
+# (and its rows, via ON DELETE CASCADE) afterwards. Needs DATABASE_URL and an
+# initialized schema (python db.py).
+#
+#   python benchmarks/bench_transcriptions_list.py --rows 10000 --repeat 20
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from db import db_cursor  # noqa: E402
+
+FULL_LIST_SQL = """
+    SELECT id, original_filename, status, uploaded_at, transcript, summary
+    FROM audio_files
+    WHERE user_id = %s
+    ORDER BY uploaded_at DESC
+"""
+
+FIRST_PAGE_SQL = """
+    SELECT id, original_filename, status, uploaded_at,
+           LEFT(COALESCE(summary, transcript, ''), 160)
+    FROM audio_files
+    WHERE user_id = %s
+    ORDER BY uploaded_at DESC, id DESC
+    LIMIT %s
+"""
+
+NEXT_PAGE_SQL = """
+    SELECT id, original_filename, status, uploaded_at,
+           LEFT(COALESCE(summary, transcript, ''), 160)
+    FROM audio_files
+    WHERE user_id = %s AND (uploaded_at, id) < (%s, %s)
+    ORDER BY uploaded_at DESC, id DESC
+    LIMIT %s
+"""
+
+WORDS = ("meeting budget roadmap customer release review follow up action item "
+         "quarter hiring design latency database model deploy").split()
+
+
+def _text(words):
+    return ' '.join(WORDS[i % len(WORDS)] for i in range(words))
+
+
+def seed(rows, transcript_words):
+    email = f"bench-{uuid.uuid4().hex[:10]}@example.invalid"
+    transcript = _text(transcript_words)
+    summary = _text(60)
+    with db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO users (name, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
+            ('Benchmark', email, 'x')
+        )
+        user_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO audio_files (user_id, filename, original_filename, transcript, summary, status, uploaded_at)
+            SELECT %s, 'bench-' || g || '.wav', 'Recording ' || g || '.wav', %s, %s, 'completed',
+                   CURRENT_TIMESTAMP - make_interval(secs => g)
+            FROM generate_series(1, %s) AS g
+        """, (user_id, transcript, summary, rows))
+        cur.execute("ANALYZE audio_files")
+    return user_id
+
+
+def cleanup(user_id):
+    with db_cursor() as cur:
+        cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+
+
+def timed(fn, repeat):
+    samples = []
+    payload_bytes = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+        payload_bytes = sum(len(str(value)) for row in rows for value in row)
+    samples.sort()
+    return {
+        'p50_ms': round(statistics.median(samples), 2),
+        'p95_ms': round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+        'rows': len(rows),
+        'payload_kb': round(payload_bytes / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the transcription listing queries')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--transcript-words', type=int, default=1500)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.rows} rows...")
+    user_id = seed(args.rows, args.transcript_words)
+    try:
+        with db_cursor() as cur:
+            cur.execute(FIRST_PAGE_SQL + " OFFSET %s", (user_id, 1, args.rows // 2))
+            middle = cur.fetchone()
+
+        def full_list():
+            with db_cursor() as cur:
+                cur.execute(FULL_LIST_SQL, (user_id,))
+                return cur.fetchall()
+
+        def first_page():
+            with db_cursor() as cur:
+                cur.execute(FIRST_PAGE_SQL, (user_id, args.page_size))
+                return cur.fetchall()
+
+        def deep_page():
+            with db_cursor() as cur:
+                cur.execute(NEXT_PAGE_SQL, (user_id, middle[3], middle[0], args.page_size))
+                return cur.fetchall()
+
+        results = {
+            'full list (old)': timed(full_list, max(1, args.repeat // 4)),
+            'keyset first page': timed(first_page, args.repeat),
+            'keyset page at 50%': timed(deep_page, args.repeat),
+        }
+    finally:
+        cleanup(user_id)
+
+    print(f"\n{'query':<22}{'p50 ms':>10}{'p95 ms':>10}{'rows':>8}{'payload KB':>12}")
+    for name, r in results.items():
+        print(f"{name:<22}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['rows']:>8}{r['payload_kb']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# backend/blobs.py
+# Content-addressed audio storage. Each distinct upload is stored once in the
+# uploads folder as <sha256>.<ext> and tracked in audio_blobs with a
+# reference count; audio_files rows point at it through content_sha256.
+# When the last row referencing a blob is deleted, the file is removed.
+import glob
+import os
+
+
+def blob_filename(sha256, extension):
+    return f"{sha256}.{extension}"
+
+
+def acquire(cur, upload_folder, sha256, extension, tmp_path, size):
+    """Take a reference on the blob for sha256, moving tmp_path into place if
+    this is new content (otherwise tmp_path is discarded). Returns
+    (filename relative to upload_folder, whether the file was created here).
+
+    If the transaction then fails, a created file must be removed before the
+    rollback (see discard), while the row lock still makes a concurrent
+    upload of the same content wait."""
+    cur.execute("""
+        INSERT INTO audio_blobs (sha256, filename, size_bytes, ref_count)
+        VALUES (%s, %s, %s, 1)
+        ON CONFLICT (sha256) DO UPDATE SET ref_count = audio_blobs.ref_count + 1
+        RETURNING filename
+    """, (sha256, blob_filename(sha256, extension), size))
+    filename = cur.fetchone()[0]
+    blob_path = os.path.join(upload_folder, filename)
+    # The existence check (rather than trusting the row) also heals a blob
+    # whose file went missing.
+    if os.path.exists(blob_path):
+        os.remove(tmp_path)
+        return filename, False
+    os.replace(tmp_path, blob_path)
+    return filename, True
+
+
+def discard(upload_folder, filename):
+    """Undo a new blob's file from acquire() in a transaction that is rolling back."""
+    path = os.path.join(upload_folder, filename)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def release(cur, upload_folder, sha256, count=1):
+    """Drop `count` references; deletes the blob row and its file at zero.
+
+    The file is removed while the row lock is still held so a concurrent
+    upload of the same content waits and then re-creates it.
+    """
+    cur.execute("""
+        UPDATE audio_blobs SET ref_count = ref_count - %s
+        WHERE sha256 = %s
+        RETURNING ref_count, filename
+    """, (count, sha256))
+    row = cur.fetchone()
+    if not row or row[0] > 0:
+        return False
+    cur.execute("DELETE FROM audio_blobs WHERE sha256 = %s", (sha256,))
+    remove_files(upload_folder, row[1])
+    return True
+
+
+def remove_files(upload_folder, filename):
+    """Remove a stored upload and the artifacts derived from it (decoded
+    audio etc.), which share its stem: <stem>.<ext> -> <stem>.*"""
+    stem = os.path.splitext(filename)[0]
+    for path in glob.glob(os.path.join(glob.escape(upload_folder), glob.escape(stem) + '.*')):
+        os.remove(path)
+
+
+def release_for_rows(cur, upload_folder, rows):
+    """Release storage for deleted audio_files rows given as (filename, content_sha256).
+
+    Rows from before content addressing have no hash and own their file outright.
+    """
+    counts = {}
+    for filename, sha256 in rows:
+        if sha256:
+            counts[sha256] = counts.get(sha256, 0) + 1
+        elif filename:
+            remove_files(upload_folder, filename)
+    for sha256, count in counts.items():
+        release(cur, upload_folder, sha256, count)
@@ -1,15 +1,224 @@
 # backend/db.py (The Final, Correct Version)
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 import psycopg2
+import psycopg2.extensions
 from dotenv import load_dotenv
+import metrics
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_AFTER = float(os.getenv("DB_POOL_HEALTHCHECK_AFTER", "30"))  # idle seconds before a SELECT 1 on checkout
+
+_pool_wait = metrics.histogram(
+    'voicevista_db_pool_wait_seconds', 'Time to check a connection out of the pool',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
 
 def get_db_connection():
+    """A new, unpooled connection. Use db_cursor() for request and job work;
+    this is for schema setup and long-lived connections such as LISTEN."""
     conn = psycopg2.connect(DATABASE_URL)
     return conn
 
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool. Callers block (up to `timeout`) when all
+    `maxconn` connections are checked out instead of failing outright."""
+
+    def __init__(self, dsn, minconn, maxconn, timeout):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()  # (conn, returned_at), most recently returned last
+        self._size = 0
+        self._checked_out = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    def _check_fork(self):
+        # Connections must not be shared across a fork (gunicorn --preload).
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _healthy(self, conn, idle_seconds):
+        if conn.closed:
+            return False
+        if idle_seconds < DB_POOL_HEALTHCHECK_AFTER:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def getconn(self):
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        while True:
+            with self._cond:
+                self._check_fork()
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(conn, time.monotonic() - returned_at):
+                self._discard(conn)
+                continue
+
+            waited = time.perf_counter() - started
+            with self._cond:
+                self._checked_out += 1
+                self._checkouts += 1
+                self._wait_seconds_total += waited
+                self._wait_seconds_max = max(self._wait_seconds_max, waited)
+            _pool_wait.observe(waited)
+            return conn
+
+    def putconn(self, conn, discard=False):
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._checked_out -= 1
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def fill(self):
+        """Open connections up to minconn so the first requests skip the handshake."""
+        while True:
+            with self._cond:
+                self._check_fork()
+                if self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'size': self._size,
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connections_created': self._created,
+                'connections_discarded': self._discarded,
+                'wait_seconds_total': round(self._wait_seconds_total, 6),
+                'wait_seconds_max': round(self._wait_seconds_max, 6),
+                'wait_seconds_avg': round(self._wait_seconds_total / self._checkouts, 6) if self._checkouts else None,
+            }
+
+
+pool = ConnectionPool(DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT)
+
+
+@contextmanager
+def db_connection():
+    """Check a pooled connection out; commit on success, roll back on error,
+    and always return it to the pool."""
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        raise
+    finally:
+        pool.putconn(conn, discard=broken or conn.closed)
+
+
+@contextmanager
+def db_cursor():
+    with db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+
+def pool_stats():
+    return pool.stats()
+
 def init_db():
     print("Initializing database schema...")
     conn = get_db_connection()
@@ -38,6 +247,8 @@ def init_db():
             export_format VARCHAR(20) DEFAULT 'pdf'
         );
     """)
+    # Per-user Whisper model size (NULL: the server default, WHISPER_MODEL)
+    cur.execute("ALTER TABLE user_settings ADD COLUMN IF NOT EXISTS model_size VARCHAR(20);")
     print("- 'user_settings' table checked/created.")
 
     # Create audio_files table
@@ -53,8 +264,197 @@ def init_db():
             uploaded_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
         );
     """)
+    # Listing index: serves the per-user, newest-first keyset pagination
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_audio_files_user_uploaded
+        ON audio_files (user_id, uploaded_at DESC, id DESC);
+    """)
+    # Full-text search: a generated tsvector is recomputed by Postgres whenever
+    # the row's title, summary or transcript changes, so completing a job
+    # updates only that row's vector.
+    cur.execute("""
+        ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(original_filename, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(summary, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(transcript, '')), 'C')
+        ) STORED;
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_audio_files_search
+        ON audio_files USING GIN (search_vector);
+    """)
+    # Upload size and SHA-256, computed while the body is streamed to disk
+    cur.execute("ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS size_bytes BIGINT;")
+    cur.execute("ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS content_sha256 CHAR(64);")
+
+    # Progress of the running transcription (0-100) and audio length
+    cur.execute("ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS progress SMALLINT DEFAULT 0;")
+    cur.execute("ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS duration_seconds REAL;")
+    # Publish status/progress changes for the /api/events stream. Any process
+    # that writes audio_files (web or worker) triggers the notification.
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION notify_audio_file_event() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' OR NEW.status IS DISTINCT FROM OLD.status
+               OR NEW.progress IS DISTINCT FROM OLD.progress THEN
+                PERFORM pg_notify('audio_file_events', json_build_object(
+                    'event', CASE
+                        WHEN TG_OP = 'INSERT' THEN 'created'
+                        WHEN NEW.status IS DISTINCT FROM OLD.status THEN 'status'
+                        ELSE 'progress'
+                    END,
+                    'user_id', NEW.user_id,
+                    'id', NEW.id,
+                    'title', NEW.original_filename,
+                    'status', NEW.status,
+                    'progress', NEW.progress,
+                    'snippet', CASE WHEN NEW.status = 'completed'
+                                    THEN LEFT(COALESCE(NEW.summary, NEW.transcript, ''), 160) END
+                )::text);
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS audio_files_notify ON audio_files;")
+    cur.execute("""
+        CREATE TRIGGER audio_files_notify
+        AFTER INSERT OR UPDATE OF status, progress ON audio_files
+        FOR EACH ROW EXECUTE FUNCTION notify_audio_file_event();
+    """)
     print("- 'audio_files' table checked/created.")
 
+    # Create transcript_segments table (timestamped segments, written as each
+    # transcription window finishes)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS transcript_segments (
+            id BIGSERIAL PRIMARY KEY,
+            audio_file_id INTEGER NOT NULL REFERENCES audio_files(id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            UNIQUE (audio_file_id, seq)
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transcript_segments_start
+        ON transcript_segments (audio_file_id, start_ms);
+    """)
+    # Speaker index from the diarization stage (NULL: not diarized)
+    cur.execute("ALTER TABLE transcript_segments ADD COLUMN IF NOT EXISTS speaker SMALLINT;")
+    print("- 'transcript_segments' table checked/created.")
+
+    # Create jobs table (persistent work queue for the background workers)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id SERIAL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            audio_file_id INTEGER REFERENCES audio_files(id) ON DELETE CASCADE,
+            payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            last_error TEXT,
+            worker_id VARCHAR(100),
+            run_after TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            heartbeat_at TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP WITH TIME ZONE,
+            finished_at TIMESTAMP WITH TIME ZONE
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, run_after, id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_audio_file ON jobs (audio_file_id);")
+    print("- 'jobs' table checked/created.")
+
+    # Create pipeline_stages table (post-transcription stages, their artifacts and timings)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_stages (
+            audio_file_id INTEGER NOT NULL REFERENCES audio_files(id) ON DELETE CASCADE,
+            stage VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            job_id INTEGER,
+            artifact JSONB,
+            error TEXT,
+            queued_at TIMESTAMP WITH TIME ZONE,
+            started_at TIMESTAMP WITH TIME ZONE,
+            finished_at TIMESTAMP WITH TIME ZONE,
+            duration_ms INTEGER,
+            PRIMARY KEY (audio_file_id, stage)
+        );
+    """)
+    print("- 'pipeline_stages' table checked/created.")
+
+    # Create audio_blobs table (content-addressed audio, reference counted by audio_files rows)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS audio_blobs (
+            sha256 CHAR(64) PRIMARY KEY,
+            filename VARCHAR(255) NOT NULL,
+            size_bytes BIGINT,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_sha256 ON audio_files (content_sha256);")
+    print("- 'audio_blobs' table checked/created.")
+
+    # Create transcription_results table (result cache keyed by audio hash + decode options)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS transcription_results (
+            audio_sha256 CHAR(64) NOT NULL,
+            options_key VARCHAR(64) NOT NULL,
+            model VARCHAR(50),
+            language VARCHAR(50),
+            transcript TEXT NOT NULL,
+            summary TEXT,
+            segments JSONB,
+            duration_seconds REAL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (audio_sha256, options_key)
+        );
+    """)
+    print("- 'transcription_results' table checked/created.")
+
+    # Create upload_sessions table (resumable uploads; bytes live in uploads/.partial/<id>)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS upload_sessions (
+            id VARCHAR(32) PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            original_filename VARCHAR(255) NOT NULL,
+            upload_length BIGINT NOT NULL,
+            upload_offset BIGINT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    print("- 'upload_sessions' table checked/created.")
+
+    # Create summary_cache table (summaries keyed by transcript hash + summary parameters)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS summary_cache (
+            content_hash CHAR(64) NOT NULL,
+            params_key VARCHAR(64) NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash, params_key)
+        );
+    """)
+    print("- 'summary_cache' table checked/created.")
+
+    # Create translation_cache table (translations keyed by source text hash + target language)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS translation_cache (
+            text_hash CHAR(64) NOT NULL,
+            target_lang VARCHAR(10) NOT NULL,
+            backend VARCHAR(20),
+            translated TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (text_hash, target_lang)
+        );
+    """)
+    print("- 'translation_cache' table checked/created.")
+
     conn.commit()
     cur.close()
     conn.close()
@@ -0,0 +1,191 @@
+# backend/diarization.py
+# Speaker diarization in plain NumPy, cheap enough to leave on by default.
+#
+# Speech regions from the VAD (preprocessing.speech_regions) are cut into
+# short overlapping windows; each window gets an embedding made of the mean
+# and standard deviation of its MFCCs, computed for all windows of a region
+# at once from a framed FFT. Windows are grouped by agglomerative
+# clustering on cosine similarity, and every transcript segment takes the
+# speaker that covers most of its time span.
+import os
+
+import numpy as np
+
+import preprocessing
+
+DIARIZATION_WINDOW_SECONDS = float(os.getenv('DIARIZATION_WINDOW_SECONDS', '1.5'))
+DIARIZATION_HOP_SECONDS = float(os.getenv('DIARIZATION_HOP_SECONDS', '0.75'))
+DIARIZATION_THRESHOLD = float(os.getenv('DIARIZATION_THRESHOLD', '0.55'))  # merge clusters more similar than this
+DIARIZATION_MAX_SPEAKERS = int(os.getenv('DIARIZATION_MAX_SPEAKERS', '8'))
+DIARIZATION_MAX_WINDOWS = int(os.getenv('DIARIZATION_MAX_WINDOWS', '800'))  # clustered directly; the rest are assigned
+
+FRAME_SECONDS = 0.025
+FRAME_HOP_SECONDS = 0.010
+N_FFT = 512
+N_MELS = 40
+N_MFCC = 20
+MFCC_BLOCK_FRAMES = 4096  # frames per FFT block, bounds memory on long regions
+
+
+def _mel_filterbank(sample_rate=preprocessing.SAMPLE_RATE, n_fft=N_FFT, n_mels=N_MELS):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    bins = np.floor((n_fft + 1) * mel_to_hz(np.linspace(0, hz_to_mel(sample_rate / 2), n_mels + 2)) / sample_rate).astype(int)
+    fbank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            fbank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            fbank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return fbank
+
+
+def _dct_matrix(n_mfcc=N_MFCC, n_mels=N_MELS):
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    return (np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2 / n_mels)).astype(np.float32)
+
+
+_FBANK = _mel_filterbank()
+_DCT = _dct_matrix()
+
+
+def mfcc(audio):
+    """(frames, N_MFCC) MFCCs of 16 kHz float32 audio, 25 ms frames every 10 ms."""
+    sample_rate = preprocessing.SAMPLE_RATE
+    frame = int(FRAME_SECONDS * sample_rate)
+    hop = int(FRAME_HOP_SECONDS * sample_rate)
+    if len(audio) < frame:
+        return np.zeros((0, N_MFCC), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(np.asarray(audio, dtype=np.float32), frame)[::hop]
+    window = np.hamming(frame).astype(np.float32)
+    out = np.empty((len(frames), N_MFCC), dtype=np.float32)
+    for i in range(0, len(frames), MFCC_BLOCK_FRAMES):
+        block = frames[i:i + MFCC_BLOCK_FRAMES] * window
+        spectrum = np.abs(np.fft.rfft(block, n=N_FFT)) ** 2
+        out[i:i + len(block)] = np.log(spectrum @ _FBANK.T + 1e-6) @ _DCT.T
+    return out
+
+
+def window_embeddings(audio, regions):
+    """Embeddings for DIARIZATION_WINDOW_SECONDS windows (hop DIARIZATION_HOP_SECONDS)
+    over the speech regions. Returns (embeddings, [(start_s, end_s)])."""
+    sample_rate = preprocessing.SAMPLE_RATE
+    frames_per_second = 1 / FRAME_HOP_SECONDS
+    win = int(DIARIZATION_WINDOW_SECONDS * frames_per_second)
+    step = int(DIARIZATION_HOP_SECONDS * frames_per_second)
+    embeddings, spans = [], []
+    for start, end in regions:
+        features = mfcc(audio[start:end])
+        if len(features) < win // 2:
+            continue
+        features = features - features.mean(axis=0)  # per-region mean normalization
+        # All windows of the region at once: (windows, win, N_MFCC)
+        if len(features) < win:
+            stacked = features[None]
+        else:
+            stacked = np.lib.stride_tricks.sliding_window_view(features, win, axis=0)[::step].transpose(0, 2, 1)
+        embeddings.append(np.concatenate([stacked.mean(axis=1), stacked.std(axis=1)], axis=1))
+        offset = start / sample_rate
+        for i in range(len(stacked)):
+            t = offset + i * step * FRAME_HOP_SECONDS
+            spans.append((t, min(t + DIARIZATION_WINDOW_SECONDS, end / sample_rate)))
+    if not embeddings:
+        return np.zeros((0, 2 * N_MFCC), dtype=np.float32), []
+    embeddings = np.concatenate(embeddings)
+    # Standardize each dimension over the file, then L2-normalize for cosine similarity
+    embeddings = (embeddings - embeddings.mean(axis=0)) / (embeddings.std(axis=0) + 1e-6)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-9
+    return embeddings.astype(np.float32), spans
+
+
+def cluster(embeddings, threshold=DIARIZATION_THRESHOLD, max_speakers=DIARIZATION_MAX_SPEAKERS):
+    """Agglomerative (centroid linkage, cosine) clustering. Returns a label per row."""
+    n = len(embeddings)
+    if n == 0:
+        return np.zeros(0, dtype=int)
+    # Long files: cluster an evenly spaced subset, assign everything else to the nearest centroid
+    subset = np.linspace(0, n - 1, min(n, DIARIZATION_MAX_WINDOWS)).astype(int)
+    sums = embeddings[subset].astype(np.float64)
+    counts = np.ones(len(subset))
+    active = np.ones(len(subset), dtype=bool)
+
+    def centroids():
+        c = sums / counts[:, None]
+        return c / (np.linalg.norm(c, axis=1, keepdims=True) + 1e-9)
+
+    c = centroids()
+    sim = c @ c.T
+    np.fill_diagonal(sim, -np.inf)
+    while active.sum() > 1:
+        i, j = np.unravel_index(np.argmax(sim), sim.shape)
+        if sim[i, j] < threshold and active.sum() <= max_speakers:
+            break
+        # Merge j into i and refresh i's similarities
+        sums[i] += sums[j]
+        counts[i] += counts[j]
+        active[j] = False
+        sim[j, :] = sim[:, j] = -np.inf
+        ci = sums[i] / counts[i]
+        ci /= np.linalg.norm(ci) + 1e-9
+        row = c @ ci
+        c[i] = ci
+        row[~active] = -np.inf
+        row[i] = -np.inf
+        sim[i, :] = sim[:, i] = row
+
+    final = centroids()[active]
+    return np.argmax(embeddings @ final.T.astype(np.float32), axis=1)
+
+
+def smooth(labels, width=3):
+    """Majority vote over a sliding window to remove single-window flips."""
+    if len(labels) < width:
+        return labels
+    n = len(labels)
+    padded = np.pad(labels, width // 2, mode='edge')
+    votes = np.zeros((n, labels.max() + 1), dtype=np.int32)
+    for offset in range(width):
+        votes[np.arange(n), padded[offset:offset + n]] += 1
+    return np.argmax(votes, axis=1)
+
+
+def label_segments(segments, spans, labels):
+    """Speaker index (numbered by first appearance) for each {'start', 'end'} segment,
+    the one whose windows overlap it the most; None where no window overlaps."""
+    if not spans:
+        return [None] * len(segments)
+    starts = np.array([s for s, _ in spans])
+    ends = np.array([e for _, e in spans])
+    n_speakers = labels.max() + 1
+    result = []
+    for seg in segments:
+        overlap = np.clip(np.minimum(ends, seg['end']) - np.maximum(starts, seg['start']), 0, None)
+        if not overlap.any():
+            result.append(None)
+            continue
+        result.append(int(np.argmax(np.bincount(labels, weights=overlap, minlength=n_speakers))))
+    # Renumber so the first speaker heard is 0
+    order = {}
+    for speaker in result:
+        if speaker is not None and speaker not in order:
+            order[speaker] = len(order)
+    return [order.get(speaker) for speaker in result]
+
+
+def diarize(audio, segments):
+    """Speaker index per transcript segment for 16 kHz audio (segments in seconds).
+    Returns (labels, stats)."""
+    regions = preprocessing.speech_regions(audio)
+    embeddings, spans = window_embeddings(audio, regions)
+    labels = smooth(cluster(embeddings))
+    speakers = label_segments(segments, spans, labels)
+    return speakers, {
+        'windows': len(spans),
+        'speakers': len({s for s in speakers if s is not None}),
+    }
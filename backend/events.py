@@ -0,0 +1,116 @@
+# backend/events.py
+# Per-user job status events for the /api/events server-sent-events stream.
+#
+# A trigger on audio_files (see db.init_db) publishes every status/progress
+# change with pg_notify, so it doesn't matter which process or gunicorn worker
+# made the change. Each web process keeps one dedicated LISTEN connection and
+# fans notifications out to the SSE clients connected to it.
+import json
+import os
+import queue
+import select
+import threading
+import time
+
+import psycopg2.extensions
+
+from db import get_db_connection
+
+EVENTS_CHANNEL = 'audio_file_events'
+EVENTS_KEEPALIVE = int(os.getenv('EVENTS_KEEPALIVE', '15'))  # seconds between SSE comments
+EVENTS_QUEUE_SIZE = 100
+
+
+class EventBroker:
+    def __init__(self, channel):
+        self.channel = channel
+        self._subscribers = {}  # user_id -> set of queues
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen_forever, daemon=True)
+                self._listener.start()
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues:
+                queues.discard(q)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    def _dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        with self._lock:
+            queues = list(self._subscribers.get(event.get('user_id'), ()))
+        for q in queues:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop its oldest event rather than block the listener
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _listen(self):
+        conn = get_db_connection()
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {self.channel};")
+            cur.close()
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _listen_forever(self):
+        backoff = 1
+        while True:
+            started = time.monotonic()
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"Event listener disconnected: {str(e)}")
+            if time.monotonic() - started > 60:
+                backoff = 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+
+broker = EventBroker(EVENTS_CHANNEL)
+
+
+def sse_stream(user_id):
+    """Generator of server-sent-event frames for one client."""
+    q = broker.subscribe(user_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = q.get(timeout=EVENTS_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event.get('event', 'status')}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(user_id, q)
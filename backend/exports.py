@@ -0,0 +1,133 @@
+# backend/exports.py
+# Rendered transcript exports (PDF, DOCX, TXT), cached on disk.
+#
+# A cached file is named after (transcription id, format, language, content
+# hash), so an edited transcript or summary simply renders to a new name and
+# the stale file ages out. Files are written straight to disk (never built as
+# one in-memory blob), served with send_file (ranges, conditional requests),
+# and the directory is kept under EXPORT_CACHE_MAX_MB by evicting the least
+# recently used files.
+import glob
+import hashlib
+import os
+import re
+import threading
+
+from docx import Document
+from fpdf import FPDF
+
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', 'export_cache')
+EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_MB', '512')) * 1024 * 1024
+EXPORT_TXT_CHUNK = 64 * 1024
+
+FORMATS = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'txt': 'text/plain; charset=utf-8',
+}
+
+_LANG = re.compile(r'^[a-z]{2,3}$')
+
+_evict_lock = threading.Lock()
+
+
+def content_hash(title, summary, transcript):
+    hasher = hashlib.sha256()
+    for part in (title, summary, transcript):
+        hasher.update((part or '').encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def etag(transcription_id, fmt, lang, digest):
+    return f"{transcription_id}-{fmt}-{lang}-{digest[:16]}"
+
+
+def cache_path(cache_dir, transcription_id, fmt, lang, digest):
+    if fmt not in FORMATS or not _LANG.match(lang or ''):
+        raise ValueError(f"Invalid export format or language: {fmt!r}, {lang!r}")
+    path = os.path.join(cache_dir, f"{etag(int(transcription_id), fmt, lang, digest)}.{fmt}")
+    if os.path.dirname(os.path.realpath(path)) != os.path.realpath(cache_dir):
+        raise ValueError(f"Export path escapes the cache directory: {path}")
+    return path
+
+
+def _render_pdf(path, title, summary, transcript):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, f'Transcription of: {title}', ln=True)
+    pdf.set_font('Arial', '', 12)
+    pdf.multi_cell(0, 10, f'Summary:\n{summary}\n\nTranscript:\n{transcript}')
+    pdf.output(path, 'F')
+
+
+def _render_docx(path, title, summary, transcript):
+    doc = Document()
+    doc.add_heading(f'Transcription of: {title}', 0)
+    doc.add_heading('Summary', level=1)
+    doc.add_paragraph(summary)
+    doc.add_heading('Transcript', level=1)
+    doc.add_paragraph(transcript)
+    doc.save(path)
+
+
+def _render_txt(path, title, summary, transcript):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"Transcription of: {title}\n\nSummary:\n{summary}\n\nTranscript:\n")
+        for i in range(0, len(transcript or ''), EXPORT_TXT_CHUNK):
+            f.write(transcript[i:i + EXPORT_TXT_CHUNK])
+
+
+RENDERERS = {'pdf': _render_pdf, 'docx': _render_docx, 'txt': _render_txt}
+
+
+def lookup(path):
+    """True if `path` is cached; marks it as recently used."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def render(path, fmt, title, summary, transcript):
+    """Render an export to `path` (atomically) and trim the cache."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        RENDERERS[fmt](tmp_path, title, summary, transcript)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(os.path.dirname(path))
+
+
+def evict(cache_dir, max_bytes=EXPORT_CACHE_MAX_BYTES):
+    """Delete least recently used exports until the cache fits in max_bytes."""
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def purge(cache_dir, transcription_ids):
+    """Drop every cached export of the given transcriptions."""
+    for transcription_id in transcription_ids:
+        for path in glob.glob(os.path.join(cache_dir, f"{int(transcription_id)}-*")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
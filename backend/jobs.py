@@ -0,0 +1,330 @@
+# backend/jobs.py
+# Persistent job queue backed by the `jobs` table, plus a fixed-size worker
+# pool (threads or processes) that drains it. Jobs survive restarts: rows are
+# claimed with FOR UPDATE SKIP LOCKED, kept alive with a heartbeat, and
+# re-queued at startup if their worker died.
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import metrics
+from db import db_cursor
+
+CPU_COUNT = os.cpu_count() or 1
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', str(max(1, CPU_COUNT // 2))))
+JOB_WORKER_MODE = os.getenv('JOB_WORKER_MODE', 'thread')  # 'thread' or 'process'
+JOB_QUEUE_MAX_DEPTH = int(os.getenv('JOB_QUEUE_MAX_DEPTH', '100'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BACKOFF = int(os.getenv('JOB_RETRY_BACKOFF', '30'))  # seconds, multiplied by attempt
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))  # seconds
+JOB_HEARTBEAT_INTERVAL = int(os.getenv('JOB_HEARTBEAT_INTERVAL', '30'))  # seconds
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '300'))  # seconds without a heartbeat
+TORCH_THREADS = int(os.getenv('TORCH_THREADS', '0'))  # intra-op threads per process; 0: cores / workers
+
+_jobs_finished = metrics.counter(
+    'voicevista_jobs_total', 'Job attempts by outcome (completed, retried, failed)', ('kind', 'outcome')
+)
+_queue_wait = metrics.histogram(
+    'voicevista_job_queue_wait_seconds', 'Time a job waited in the queue before a worker claimed it', ('kind',)
+)
+_queue_jobs = metrics.gauge('voicevista_job_queue_jobs', 'Jobs in the queue by kind and status', ('kind', 'status'))
+_queue_oldest = metrics.gauge(
+    'voicevista_job_queue_oldest_age_seconds', 'Age of the oldest runnable queued job', ('kind',)
+)
+
+_handlers = {}
+_wakeup = threading.Event()
+_running_jobs = set()
+_running_lock = threading.Lock()
+
+
+class QueueFull(Exception):
+    def __init__(self, depth):
+        super().__init__(f"Job queue is full ({depth} queued)")
+        self.depth = depth
+
+
+def handler(kind, on_failure=None):
+    """Register a job handler: fn(job) where job is a dict with id, kind, audio_file_id, payload, attempts.
+
+    on_failure(job, error) runs once a job has used up all of its attempts.
+    """
+    def register(fn):
+        _handlers[kind] = {'run': fn, 'on_failure': on_failure}
+        return fn
+    return register
+
+
+def queue_depth(cur):
+    cur.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'")
+    return cur.fetchone()[0]
+
+
+def enqueue(cur, kind, audio_file_id=None, payload=None, max_attempts=JOB_MAX_ATTEMPTS, enforce_limit=True):
+    """Insert a job using the caller's cursor (commit is left to the caller).
+
+    Returns (job_id, queue_position). Raises QueueFull when the backlog is at
+    JOB_QUEUE_MAX_DEPTH so the HTTP layer can push back with a 429.
+    """
+    if enforce_limit:
+        depth = queue_depth(cur)
+        if depth >= JOB_QUEUE_MAX_DEPTH:
+            raise QueueFull(depth)
+    cur.execute("""
+        INSERT INTO jobs (kind, audio_file_id, payload, max_attempts)
+        VALUES (%s, %s, %s, %s) RETURNING id
+    """, (kind, audio_file_id, json.dumps(payload or {}), max_attempts))
+    job_id = cur.fetchone()[0]
+    cur.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id <= %s", (job_id,))
+    position = cur.fetchone()[0]
+    _wakeup.set()
+    return job_id, position
+
+
+def queue_position(cur, audio_file_id):
+    """1-based position of the file's queued job, 0 if running, None if it has no pending job."""
+    cur.execute("""
+        SELECT id, status FROM jobs
+        WHERE audio_file_id = %s AND status IN ('queued', 'running')
+        ORDER BY id LIMIT 1
+    """, (audio_file_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    if row[1] == 'running':
+        return 0
+    cur.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id <= %s", (row[0],))
+    return cur.fetchone()[0]
+
+
+@metrics.collector
+def _collect_queue():
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT kind, status, COUNT(*),
+                   EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(run_after)
+                           FILTER (WHERE status = 'queued' AND run_after <= CURRENT_TIMESTAMP))
+            FROM jobs
+            WHERE status IN ('queued', 'running')
+            GROUP BY kind, status
+        """)
+        rows = cur.fetchall()
+    # Kinds that drained since the last scrape report zero instead of a stale value
+    for kind in _handlers:
+        for status in ('queued', 'running'):
+            _queue_jobs.set(0, kind=kind, status=status)
+        _queue_oldest.set(0, kind=kind)
+    for kind, status, count, oldest in rows:
+        _queue_jobs.set(count, kind=kind, status=status)
+        if status == 'queued':
+            _queue_oldest.set(round(float(oldest or 0), 3), kind=kind)
+
+
+def _claim(worker_id):
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, worker_id = %s,
+                started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued' AND run_after <= CURRENT_TIMESTAMP
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, kind, audio_file_id, payload, attempts, max_attempts,
+                      EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - run_after)
+        """, (worker_id,))
+        row = cur.fetchone()
+    if not row:
+        return None
+    _queue_wait.observe(max(0.0, float(row[6] or 0)), kind=row[1])
+    return {
+        'id': row[0],
+        'kind': row[1],
+        'audio_file_id': row[2],
+        'payload': row[3] or {},
+        'attempts': row[4],
+        'max_attempts': row[5],
+    }
+
+
+def _finish(job, error=None):
+    with db_cursor() as cur:
+        if error is None:
+            _jobs_finished.inc(kind=job['kind'], outcome='completed')
+            cur.execute("""
+                UPDATE jobs SET status = 'completed', last_error = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (job['id'],))
+        elif job['attempts'] < job['max_attempts']:
+            _jobs_finished.inc(kind=job['kind'], outcome='retried')
+            cur.execute("""
+                UPDATE jobs
+                SET status = 'queued', last_error = %s, worker_id = NULL,
+                    run_after = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                WHERE id = %s
+            """, (error, JOB_RETRY_BACKOFF * job['attempts'], job['id']))
+        else:
+            _jobs_finished.inc(kind=job['kind'], outcome='failed')
+            cur.execute("""
+                UPDATE jobs SET status = 'failed', last_error = %s, finished_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (error, job['id']))
+
+
+def _run(job):
+    entry = _handlers.get(job['kind'])
+    if entry is None:
+        _finish(dict(job, attempts=job['max_attempts']), f"No handler registered for job kind '{job['kind']}'")
+        return
+    with _running_lock:
+        _running_jobs.add(job['id'])
+    try:
+        # Root span of the job's trace; stage spans opened by the handler nest under it
+        with metrics.span(f"job:{job['kind']}", trace_id=f"job-{job['id']}", job_id=job['id'],
+                          audio_file_id=job['audio_file_id'], attempt=job['attempts']):
+            entry['run'](job)
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+        print(f"Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}/{job['max_attempts']}: {error}")
+        traceback.print_exc()
+        _finish(job, error)
+        if job['attempts'] >= job['max_attempts'] and entry['on_failure']:
+            try:
+                entry['on_failure'](job, error)
+            except Exception as hook_error:
+                print(f"Failure hook for job {job['id']} failed: {str(hook_error)}")
+    else:
+        _finish(job)
+    finally:
+        with _running_lock:
+            _running_jobs.discard(job['id'])
+
+
+def _worker_loop(worker_id):
+    while True:
+        try:
+            job = _claim(worker_id)
+        except Exception as e:
+            print(f"Worker {worker_id} could not claim a job: {str(e)}")
+            job = None
+        if job is None:
+            _wakeup.wait(JOB_POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+        _run(job)
+
+
+def _requeue_stale(cur):
+    cur.execute("""
+        UPDATE jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            worker_id = NULL, last_error = 'Worker stopped before the job finished'
+        WHERE status = 'running'
+          AND COALESCE(heartbeat_at, started_at) < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        RETURNING id, status
+    """, (JOB_STALE_AFTER,))
+    requeued = cur.fetchall()
+    for job_id, status in requeued:
+        print(f"Recovered orphaned job {job_id} -> {status}")
+    return requeued
+
+
+def _heartbeat_loop():
+    # Keeps this process's running jobs alive and, as a side duty, recovers jobs
+    # left behind by workers (in any process) that died mid-job.
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with _running_lock:
+            job_ids = list(_running_jobs)
+        try:
+            with db_cursor() as cur:
+                if job_ids:
+                    cur.execute("UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE id = ANY(%s)", (job_ids,))
+                _requeue_stale(cur)
+        except Exception as e:
+            print(f"Job heartbeat failed: {str(e)}")
+
+
+def recover_orphans(orphaned_file_handler=None):
+    """Re-queue jobs whose worker stopped heartbeating, and hand audio_files rows
+    stuck in 'processing' without any pending job to orphaned_file_handler(cur, file_id, filename)."""
+    with db_cursor() as cur:
+        requeued = _requeue_stale(cur)
+        cur.execute("""
+            SELECT af.id, af.filename FROM audio_files af
+            WHERE af.status = 'processing'
+              AND NOT EXISTS (
+                  SELECT 1 FROM jobs j
+                  WHERE j.audio_file_id = af.id AND j.status IN ('queued', 'running')
+              )
+        """)
+        orphaned_files = cur.fetchall()
+        if orphaned_file_handler:
+            for file_id, filename in orphaned_files:
+                orphaned_file_handler(cur, file_id, filename)
+    return len(requeued), len(orphaned_files)
+
+
+def _limit_torch_threads(workers):
+    # N workers each running inference with every core would oversubscribe the CPU.
+    try:
+        import torch
+        torch.set_num_threads(TORCH_THREADS or max(1, CPU_COUNT // max(1, workers)))
+    except Exception:
+        pass
+
+
+def _start_threads(count, prefix):
+    threading.Thread(target=_heartbeat_loop, daemon=True).start()
+    for i in range(count):
+        threading.Thread(target=_worker_loop, args=(f"{prefix}-{i}",), daemon=True).start()
+
+
+def _process_main(handler_module, worker_id, total_workers, index):
+    importlib.import_module(handler_module)
+    if metrics.METRICS_PORT:
+        # Every worker process has its own metrics; each gets the next port up
+        metrics.serve(metrics.METRICS_PORT + 1 + index)
+    _limit_torch_threads(total_workers)
+    _start_threads(1, worker_id)
+    while True:
+        time.sleep(3600)
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_workers(handler_module, count=JOB_WORKERS, mode=JOB_WORKER_MODE):
+    """Start the worker pool once per process. handler_module is imported in
+    every worker so its @handler registrations are available there."""
+    global _started
+    with _start_lock:
+        if _started or count <= 0:
+            return
+        _started = True
+    importlib.import_module(handler_module)
+    prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    print(f"Starting {count} {mode} job worker(s)")
+    if mode == 'process':
+        ctx = multiprocessing.get_context('spawn')
+        for i in range(count):
+            ctx.Process(target=_process_main, args=(handler_module, f"{prefix}-p{i}", count, i), daemon=True).start()
+    else:
+        # Threads share one Whisper instance and decode on it one at a time
+        # (model_registry), so each decode gets every core
+        _limit_torch_threads(1)
+        _start_threads(count, prefix)
+
+
+def wake():
+    _wakeup.set()
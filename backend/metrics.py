@@ -0,0 +1,251 @@
+# backend/metrics.py
+# In-process metrics in the Prometheus text format, plus trace spans.
+#
+# Counters, gauges and histograms live in a module-level registry and are
+# rendered by render() for GET /metrics (and, in standalone workers, by the
+# small HTTP server started with serve()). Values that are cheaper to read
+# than to track, such as queue depth or the model cache, are added at scrape
+# time by collector callbacks.
+#
+# span(name, **attrs) times a block of work: the duration goes into the
+# voicevista_stage_duration_seconds histogram under stage=name, and with
+# TRACE_SPANS=1 a JSON line with trace/span/parent ids is printed, so the
+# stages of one job can be lined up and the slow one found.
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_SPANS = os.getenv('TRACE_SPANS', '1') == '1'
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # standalone workers only; 0: no metrics server
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_lock = threading.Lock()
+_metrics = {}
+_collectors = []
+_local = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        lines = []
+        for key, entry in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(entry['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {entry['count']}")
+        return lines
+
+
+def _register(metric):
+    with _lock:
+        return _metrics.setdefault(metric.name, metric)
+
+
+def counter(name, help, labelnames=()):
+    return _register(Counter(name, help, labelnames))
+
+
+def gauge(name, help, labelnames=()):
+    return _register(Gauge(name, help, labelnames))
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def collector(fn):
+    """Register fn() to run before every render (to set scrape-time gauges)."""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    for fn in list(_collectors):
+        try:
+            fn()
+        except Exception as e:
+            print(f"Metrics collector {fn.__name__} failed: {str(e)}")
+    lines = []
+    with _lock:
+        for metric in _metrics.values():
+            lines.extend(metric._header())
+            lines.extend(metric._samples())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Shared metrics ---
+
+stage_seconds = histogram(
+    'voicevista_stage_duration_seconds',
+    'Duration of a unit of work (decode, model_load, transcribe, summarize, translate, render, diarize, job:<kind>)',
+    ('stage',)
+)
+stage_errors = counter('voicevista_stage_errors_total', 'Spans that ended with an exception', ('stage',))
+
+
+# --- Trace spans ---
+
+def _stack():
+    if not hasattr(_local, 'spans'):
+        _local.spans = []
+    return _local.spans
+
+
+@contextmanager
+def span(name, trace_id=None, **attrs):
+    """Time a block as a stage. Nested spans on the same thread share the
+    trace id and record their parent. Yields a dict; keys added to it are
+    emitted with the span."""
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    current = {
+        'trace_id': trace_id or (parent['trace_id'] if parent else uuid.uuid4().hex[:16]),
+        'span_id': uuid.uuid4().hex[:8],
+        'attrs': dict(attrs),
+    }
+    stack.append(current)
+    started_at = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current['attrs']
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+        stage_errors.inc(stage=name)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        stack.pop()
+        stage_seconds.observe(seconds, stage=name)
+        if TRACE_SPANS:
+            record = {
+                'span': name,
+                'trace_id': current['trace_id'],
+                'span_id': current['span_id'],
+                'parent_id': parent['span_id'] if parent else None,
+                'start': round(started_at, 6),
+                'duration_ms': round(seconds * 1000, 3),
+            }
+            record.update(current['attrs'])
+            if error:
+                record['error'] = error
+            print(json.dumps(record, default=str), flush=True)
+
+
+# --- Standalone exporter (worker.py) ---
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=METRICS_PORT):
+    """Serve /metrics on `port` from a daemon thread (for processes without Flask)."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer(('0.0.0.0', port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on :{port}/metrics")
+    return server
@@ -0,0 +1,282 @@
+# backend/model_registry.py
+# Process-wide registry for heavyweight models (Whisper, and anything else
+# registered with a loader). Each (kind, name, device, precision) is loaded
+# once per process and shared by every job in that process.
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+WHISPER_DEVICE = os.getenv('WHISPER_DEVICE', 'cpu')
+WHISPER_PRECISION = os.getenv('WHISPER_PRECISION', 'fp32')  # fp32, fp16 (GPU) or int8 (CPU)
+# Model sizes a user may pick in their settings; the first entry should be WHISPER_MODEL's
+WHISPER_ALLOWED_MODELS = [m.strip() for m in os.getenv('WHISPER_ALLOWED_MODELS', 'tiny,base,small').split(',') if m.strip()]
+MODEL_MEMORY_BUDGET_MB = int(os.getenv('MODEL_MEMORY_BUDGET_MB', '4096'))
+MODEL_IDLE_TTL = int(os.getenv('MODEL_IDLE_TTL', '1800'))  # seconds
+MODEL_SWEEP_INTERVAL = int(os.getenv('MODEL_SWEEP_INTERVAL', '60'))  # seconds
+
+_cache_requests = metrics.counter(
+    'voicevista_model_cache_requests_total', 'Model registry lookups by result (hit or miss)', ('kind', 'result')
+)
+
+
+def _estimate_size(model):
+    """Best-effort size in bytes of a torch module (or an object wrapping one)."""
+    module = getattr(model, 'model', model)
+    total = 0
+    try:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    except Exception:
+        return 0
+    return total
+
+
+class _Entry:
+    def __init__(self, model, size, load_seconds):
+        self.model = model
+        self.size = size
+        self.load_seconds = load_seconds
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.hits = 0
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_bytes, idle_ttl):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_ttl = idle_ttl
+        self._loaders = {}
+        self._entries = OrderedDict()  # key -> _Entry, least recently used first
+        self._key_locks = {}
+        self._inference_locks = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds_total = 0.0
+
+    def register_loader(self, kind, loader):
+        """loader(name, device, precision) -> model"""
+        self._loaders[kind] = loader
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _inference_lock(self, key):
+        with self._lock:
+            return self._inference_locks.setdefault(key, threading.Lock())
+
+    def _checkout(self, key, pin):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.last_used = time.monotonic()
+                entry.hits += 1
+                self._hits += 1
+                _cache_requests.inc(kind=key[0], result='hit')
+                if pin:
+                    entry.in_use += 1
+            return entry
+
+    def _load(self, key, pin):
+        kind, name, device, precision = key
+        entry = self._checkout(key, pin)
+        if entry is not None:
+            return entry.model
+
+        # Only one thread loads a given key; others wait on the same lock and
+        # then pick the model up from the cache.
+        with self._key_lock(key):
+            entry = self._checkout(key, pin)
+            if entry is not None:
+                return entry.model
+
+            loader = self._loaders.get(kind)
+            if loader is None:
+                raise KeyError(f"No loader registered for model kind '{kind}'")
+
+            print(f"Loading {kind} model '{name}' ({device}, {precision})...")
+            _cache_requests.inc(kind=kind, result='miss')
+            started = time.perf_counter()
+            with metrics.span('model_load', kind=kind, model=name, device=device, precision=precision):
+                model = loader(name, device, precision)
+            load_seconds = time.perf_counter() - started
+            entry = _Entry(model, _estimate_size(model), load_seconds)
+            if pin:
+                entry.in_use = 1
+            print(f"Loaded {kind} model '{name}' in {load_seconds:.2f}s ({entry.size / 2**20:.0f} MB)")
+
+            with self._lock:
+                self._entries[key] = entry
+                self._misses += 1
+                self._load_seconds_total += load_seconds
+            self._enforce_budget()
+            return model
+
+    def get(self, kind, name, device='cpu', precision='fp32'):
+        return self._load((kind, name, device, precision), pin=False)
+
+    @contextmanager
+    def use(self, kind, name, device='cpu', precision='fp32', exclusive=False):
+        """Check a model out for the duration of a job; pinned models are never evicted.
+
+        With exclusive=True only one thread at a time runs inside the block for
+        this key, for models whose inference isn't safe to run concurrently.
+        """
+        key = (kind, name, device, precision)
+        model = self._load(key, pin=True)
+        lock = self._inference_lock(key) if exclusive else None
+        try:
+            if lock is not None:
+                lock.acquire()
+            try:
+                yield model
+            finally:
+                if lock is not None:
+                    lock.release()
+        finally:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.in_use = max(0, entry.in_use - 1)
+                    entry.last_used = time.monotonic()
+
+    def _evict(self, key):
+        # Caller holds self._lock
+        entry = self._entries.pop(key)
+        self._evictions += 1
+        print(f"Evicting {key[0]} model '{key[1]}' ({key[2]}, {key[3]})")
+        return entry
+
+    def _release(self, evicted):
+        if not evicted:
+            return
+        del evicted[:]
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+    def _enforce_budget(self):
+        evicted = []
+        with self._lock:
+            used = sum(e.size for e in self._entries.values())
+            for key in list(self._entries):
+                if used <= self.memory_budget_bytes:
+                    break
+                entry = self._entries[key]
+                if entry.in_use:
+                    continue
+                used -= entry.size
+                evicted.append(self._evict(key))
+        self._release(evicted)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if not entry.in_use and now - entry.last_used > self.idle_ttl:
+                    evicted.append(self._evict(key))
+        self._release(evicted)
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"Model sweep failed: {str(e)}")
+
+    def start_sweeper(self, interval=MODEL_SWEEP_INTERVAL):
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_forever, args=(interval,), daemon=True)
+            self._sweeper.start()
+
+    def warm(self, kind, name, device='cpu', precision='fp32'):
+        try:
+            self.get(kind, name, device, precision)
+        except Exception as e:
+            print(f"Failed to warm {kind} model '{name}': {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': (self._hits / lookups) if lookups else None,
+                'evictions': self._evictions,
+                'load_seconds_total': round(self._load_seconds_total, 3),
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'memory_used_bytes': sum(e.size for e in self._entries.values()),
+                'models': [{
+                    'kind': key[0],
+                    'name': key[1],
+                    'device': key[2],
+                    'precision': key[3],
+                    'size_bytes': entry.size,
+                    'load_seconds': round(entry.load_seconds, 3),
+                    'hits': entry.hits,
+                    'in_use': entry.in_use,
+                    'idle_seconds': round(time.monotonic() - entry.last_used, 1),
+                } for key, entry in self._entries.items()],
+            }
+
+
+def _quantize_int8(model):
+    """Dynamic int8 quantization of the Linear layers (CPU only): weights are
+    stored as int8, activations are quantized on the fly per batch."""
+    import torch
+    # Whisper's Linear subclass only adds a dtype cast; quantize_dynamic
+    # matches on exact types, so turn those into plain nn.Linear first.
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_whisper(name, device, precision):
+    import whisper
+    if precision == 'int8':
+        if device != 'cpu':
+            raise ValueError('int8 Whisper inference is only supported on CPU')
+        return _quantize_int8(whisper.load_model(name, device='cpu'))
+    # fp16 is applied per call via transcribe(fp16=True); Whisper's layers cast
+    # their weights to the activation dtype, so the fp32 checkpoint is shared.
+    return whisper.load_model(name, device=device)
+
+
+registry = ModelRegistry(MODEL_MEMORY_BUDGET_MB * 1024 * 1024, MODEL_IDLE_TTL)
+registry.register_loader('whisper', _load_whisper)
+
+
+def whisper_model(name=None, device=None, precision=None):
+    """Context manager yielding the shared Whisper model for this process.
+
+    Held exclusively: decoding installs kv-cache hooks on the shared decoder,
+    so two overlapping decodes on one instance would corrupt each other.
+    Concurrent short clips are combined by batching.py instead.
+    """
+    return registry.use('whisper', name or WHISPER_MODEL, device or WHISPER_DEVICE, precision or WHISPER_PRECISION,
+                        exclusive=True)
+
+
+def warm_default_models():
+    registry.warm('whisper', WHISPER_MODEL, WHISPER_DEVICE, WHISPER_PRECISION)
+    registry.start_sweeper()
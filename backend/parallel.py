@@ -0,0 +1,138 @@
+# backend/parallel.py
+# Split-and-merge transcription for long recordings. The (already decoded and
+# VAD-trimmed) audio is cut at the quietest point near each part boundary,
+# parts are transcribed concurrently in a pool of spawned processes (each with
+# its own Whisper instance and a fixed share of the CPU threads), and the
+# results are stitched back together in order.
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import preprocessing
+
+CPU_COUNT = os.cpu_count() or 1
+TRANSCRIBE_PROCESSES = int(os.getenv('TRANSCRIBE_PROCESSES', '0'))  # 0 or 1 disables split-and-merge
+TRANSCRIBE_THREADS_PER_PROCESS = int(os.getenv('TRANSCRIBE_THREADS_PER_PROCESS', '0'))  # 0: share the cores evenly
+PARALLEL_MIN_SECONDS = int(os.getenv('PARALLEL_MIN_SECONDS', '600'))  # shorter audio is transcribed in one pass
+PARALLEL_MIN_PART_SECONDS = int(os.getenv('PARALLEL_MIN_PART_SECONDS', '60'))
+PARALLEL_OVERLAP_SECONDS = float(os.getenv('PARALLEL_OVERLAP_SECONDS', '1.0'))
+PARALLEL_SEARCH_SECONDS = 5.0  # how far from a boundary to look for silence
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_process(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            threads = TRANSCRIBE_THREADS_PER_PROCESS or max(1, CPU_COUNT // TRANSCRIBE_PROCESSES)
+            _pool = ProcessPoolExecutor(
+                max_workers=TRANSCRIBE_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_process,
+                initargs=(threads,)
+            )
+            print(f"Started {TRANSCRIBE_PROCESSES} transcription process(es), {threads} thread(s) each")
+        return _pool
+
+
+def enabled_for(audio):
+    """Whether `audio` should be split. Daemonic processes (JOB_WORKER_MODE=process)
+    can't start a pool of their own, so they always transcribe in one pass."""
+    return (
+        TRANSCRIBE_PROCESSES > 1
+        and not multiprocessing.current_process().daemon
+        and len(audio) >= PARALLEL_MIN_SECONDS * preprocessing.SAMPLE_RATE
+    )
+
+
+def split_points(audio, parts):
+    """Sample offsets that cut `audio` into `parts` roughly equal pieces, each
+    cut moved to the quietest frame within PARALLEL_SEARCH_SECONDS of its target."""
+    total = len(audio)
+    search = int(PARALLEL_SEARCH_SECONDS * preprocessing.SAMPLE_RATE)
+    cuts = [0]
+    for k in range(1, parts):
+        target = total * k // parts
+        lo = max(cuts[-1] + 1, target - search)
+        hi = min(total, target + search)
+        energy, frame = preprocessing.frame_energy_db(audio[lo:hi])
+        cuts.append(lo + int(np.argmin(energy)) * frame + frame // 2 if len(energy) else target)
+    cuts.append(total)
+    return cuts
+
+
+def _transcribe_part(audio, fp16, model_name, decode_options):
+    # Runs in a pool process; each model is loaded once per process by the registry
+    import model_registry
+    import transcription
+    with model_registry.whisper_model(model_name) as model:
+        return transcription.transcribe_incremental(model, audio, fp16=fp16, **decode_options)['segments']
+
+
+def _stitch(kept, segments, own_start, own_end):
+    """Append a part's segments (absolute seconds in the trimmed audio) that
+    belong to its own span; the overlap is owned by the neighbour. A segment
+    repeating the text of the one before it is dropped as a seam duplicate."""
+    added = []
+    for seg in segments:
+        middle = (seg['start'] + seg['end']) / 2
+        if not own_start <= middle < own_end:
+            continue
+        previous = added[-1] if added else (kept[-1] if kept else None)
+        if previous and previous['text'] == seg['text'] and seg['start'] - previous['end'] < PARALLEL_OVERLAP_SECONDS * 2:
+            continue
+        added.append(seg)
+    kept.extend(added)
+    return added
+
+
+def transcribe_parallel(audio, on_part=None, fp16=False, timeline=None, model_name=None, **decode_options):
+    """Same contract as transcription.transcribe_incremental, but parts are
+    transcribed concurrently; on_part(segments, progress) is called in order
+    as each part's result becomes available. The result also carries
+    'wall_seconds' and 'parts'."""
+    sample_rate = preprocessing.SAMPLE_RATE
+    started = time.perf_counter()
+    total = len(audio)
+    min_part = PARALLEL_MIN_PART_SECONDS * sample_rate
+    # Two parts per process so a slow part doesn't leave the others idle
+    parts = max(1, min(TRANSCRIBE_PROCESSES * 2, math.ceil(total / min_part)))
+    cuts = split_points(audio, parts)
+    overlap = int(PARALLEL_OVERLAP_SECONDS * sample_rate)
+
+    pool = _get_pool()
+    futures = []
+    for start, end in zip(cuts, cuts[1:]):
+        lo, hi = max(0, start - overlap), min(total, end + overlap)
+        futures.append((start, end, lo, pool.submit(_transcribe_part, np.array(audio[lo:hi]), fp16, model_name, decode_options)))
+
+    to_original = timeline.to_original if timeline else (lambda seconds: seconds)
+    kept = []
+    for i, (start, end, lo, future) in enumerate(futures):
+        base = lo / sample_rate
+        segments = [{'start': base + s['start'], 'end': base + s['end'], 'text': s['text']} for s in future.result()]
+        added = _stitch(kept, segments, start / sample_rate, end / sample_rate)
+        if on_part:
+            on_part([{'start': to_original(s['start']), 'end': to_original(s['end']), 'text': s['text']} for s in added],
+                    min(100, int(end * 100 / total)))
+
+    all_segments = [{'start': to_original(s['start']), 'end': to_original(s['end']), 'text': s['text']} for s in kept]
+    return {
+        'text': ' '.join(s['text'] for s in all_segments),
+        'segments': all_segments,
+        'duration': timeline.duration if timeline else total / sample_rate,
+        'wall_seconds': time.perf_counter() - started,
+        'parts': parts
+    }
@@ -0,0 +1,311 @@
+# backend/pipeline.py
+# Post-transcription pipeline. Each stage (summary, translation, rendered
+# export, speaker diarization) runs as its own job in the queue from jobs.py
+# once the stages it depends on have completed, and leaves a stored artifact
+# behind: the summary in audio_files, translations in translation_cache,
+# exports in the export cache, speaker labels in transcript_segments.
+# Progress and per-stage timings are kept in pipeline_stages, one row per
+# (audio file, stage key).
+#
+# A stage key is the stage name plus its parameters, e.g. 'summarize',
+# 'translate:es', 'render:pdf:es'.
+import json
+import os
+import time
+
+import diarization
+import exports
+import jobs
+import metrics
+import preprocessing
+import summarizer
+import translation
+import uploads
+from db import db_cursor
+
+# Language names stored in user_settings.transcription_language
+LANGUAGE_CODES = {
+    'English': 'en', 'Spanish': 'es', 'German': 'de', 'Russian': 'ru', 'Hindi': 'hi',
+    'Japanese': 'ja', 'Korean': 'ko', 'Chinese': 'zh',
+}
+# Export languages a client may ask for ('co': Colombian Spanish)
+SUPPORTED_LANGUAGES = frozenset(LANGUAGE_CODES.values()) | {'co', translation.TRANSLATION_SOURCE_LANG}
+
+_stages = {}
+
+
+def stage(name, requires=lambda *params: ()):
+    """Register a stage: fn(audio_file_id, *params) -> artifact dict (stored as JSON).
+    requires(*params) lists the stage keys that must complete first."""
+    def register(fn):
+        _stages[name] = {'run': fn, 'requires': requires}
+        return fn
+    return register
+
+
+def stage_key(name, *params):
+    return ':'.join((name,) + tuple(str(p) for p in params))
+
+
+def _parse(key):
+    name, *params = key.split(':')
+    return name, params
+
+
+def _with_requirements(keys):
+    """keys plus everything they (transitively) depend on."""
+    seen = []
+    pending = list(keys)
+    while pending:
+        key = pending.pop()
+        if key in seen:
+            continue
+        seen.append(key)
+        name, params = _parse(key)
+        pending.extend(_stages[name]['requires'](*params))
+    return seen
+
+
+def language_code(setting):
+    if not setting:
+        return translation.TRANSLATION_SOURCE_LANG
+    return LANGUAGE_CODES.get(setting, setting.lower())
+
+
+def default_stages(lang, export_format, voice_diarization=True):
+    stages = [stage_key('render', export_format if export_format in exports.FORMATS else 'pdf', lang)]
+    if voice_diarization:
+        stages.append(stage_key('diarize'))
+    return stages
+
+
+def request(cur, audio_file_id, keys):
+    """Make sure the given stages (and their requirements) are scheduled.
+
+    The requested stages themselves are re-run even if they completed before
+    (their artifact is gone, e.g. evicted from the export cache); failed
+    requirements get another try.
+    """
+    for key in _with_requirements(keys):
+        cur.execute("""
+            INSERT INTO pipeline_stages (audio_file_id, stage, status)
+            VALUES (%s, %s, 'pending')
+            ON CONFLICT (audio_file_id, stage) DO UPDATE
+            SET status = 'pending', job_id = NULL, error = NULL
+            WHERE pipeline_stages.status = 'failed'
+               OR (pipeline_stages.status = 'completed' AND pipeline_stages.stage = ANY(%s))
+        """, (audio_file_id, key, list(keys)))
+    _enqueue_ready(cur, audio_file_id)
+
+
+def start(cur, audio_file_id, settings=None):
+    """Schedule the default stages for a freshly transcribed file from its owner's
+    settings: the snapshot taken at upload if given, otherwise looked up."""
+    if settings is not None:
+        row = (settings.get('transcription_language'), settings.get('export_format'),
+               settings.get('voice_diarization') is not False)
+    else:
+        cur.execute("""
+            SELECT us.transcription_language, us.export_format, COALESCE(us.voice_diarization, true)
+            FROM audio_files af
+            LEFT JOIN user_settings us ON us.user_id = af.user_id
+            WHERE af.id = %s
+        """, (audio_file_id,))
+        row = cur.fetchone() or (None, None, True)
+    request(cur, audio_file_id, default_stages(language_code(row[0]), row[1], row[2]))
+
+
+def _enqueue_ready(cur, audio_file_id):
+    cur.execute("""
+        SELECT stage, status FROM pipeline_stages WHERE audio_file_id = %s
+    """, (audio_file_id,))
+    statuses = dict(cur.fetchall())
+    for key, status in statuses.items():
+        if status != 'pending':
+            continue
+        name, params = _parse(key)
+        if any(statuses.get(dep) != 'completed' for dep in _stages[name]['requires'](*params)):
+            continue
+        # Claim the transition so two finishing stages don't both queue it
+        cur.execute("""
+            UPDATE pipeline_stages SET status = 'queued', queued_at = CURRENT_TIMESTAMP
+            WHERE audio_file_id = %s AND stage = %s AND status = 'pending'
+            RETURNING stage
+        """, (audio_file_id, key))
+        if cur.fetchone():
+            job_id, _ = jobs.enqueue(cur, 'stage', audio_file_id, {'stage': key}, enforce_limit=False)
+            cur.execute("""
+                UPDATE pipeline_stages SET job_id = %s WHERE audio_file_id = %s AND stage = %s
+            """, (job_id, audio_file_id, key))
+
+
+def record(cur, audio_file_id, key, started_at, seconds, artifact=None):
+    """Store a completed stage's timing (also used for the transcription itself)."""
+    cur.execute("""
+        INSERT INTO pipeline_stages (audio_file_id, stage, status, started_at, finished_at, duration_ms, artifact)
+        VALUES (%s, %s, 'completed', to_timestamp(%s), CURRENT_TIMESTAMP, %s, %s)
+        ON CONFLICT (audio_file_id, stage) DO UPDATE
+        SET status = 'completed', started_at = EXCLUDED.started_at, finished_at = EXCLUDED.finished_at,
+            duration_ms = EXCLUDED.duration_ms, artifact = EXCLUDED.artifact, error = NULL
+    """, (audio_file_id, key, started_at, int(seconds * 1000), json.dumps(artifact or {})))
+
+
+def state(cur, audio_file_id, key):
+    """(status, artifact) of a stage; (None, {}) if it was never scheduled."""
+    cur.execute("""
+        SELECT status, artifact FROM pipeline_stages WHERE audio_file_id = %s AND stage = %s
+    """, (audio_file_id, key))
+    row = cur.fetchone()
+    return (row[0], row[1] or {}) if row else (None, {})
+
+
+def failed_stage(cur, audio_file_id, key):
+    """(stage, error) of the first failed stage among key and its requirements, or None."""
+    cur.execute("""
+        SELECT stage, error FROM pipeline_stages
+        WHERE audio_file_id = %s AND stage = ANY(%s) AND status = 'failed'
+        ORDER BY stage LIMIT 1
+    """, (audio_file_id, _with_requirements([key])))
+    return cur.fetchone()
+
+
+def timings(cur, audio_file_id):
+    cur.execute("""
+        SELECT stage, status, queued_at, started_at, finished_at, duration_ms, error
+        FROM pipeline_stages
+        WHERE audio_file_id = %s
+        ORDER BY COALESCE(started_at, queued_at), stage
+    """, (audio_file_id,))
+    return [{
+        'stage': r[0],
+        'status': r[1],
+        'queued_at': r[2].isoformat() if r[2] else None,
+        'started_at': r[3].isoformat() if r[3] else None,
+        'finished_at': r[4].isoformat() if r[4] else None,
+        'duration_ms': r[5],
+        'error': r[6],
+    } for r in cur.fetchall()]
+
+
+def _load_texts(audio_file_id):
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT original_filename, transcript, summary, content_sha256
+            FROM audio_files WHERE id = %s
+        """, (audio_file_id,))
+        return cur.fetchone()
+
+
+# --- Stages ---
+
+@stage('summarize')
+def summarize(audio_file_id):
+    _, transcript, summary, sha256 = _load_texts(audio_file_id)
+    if summary:
+        return {'cached': True}
+    summary = summarizer.get_summary(transcript)
+    with db_cursor() as cur:
+        cur.execute("UPDATE audio_files SET summary = %s WHERE id = %s", (summary, audio_file_id))
+        if sha256:
+            # Let later uploads of the same audio reuse it from the result cache
+            cur.execute("""
+                UPDATE transcription_results SET summary = %s
+                WHERE audio_sha256 = %s AND summary IS NULL AND transcript = %s
+            """, (summary, sha256, transcript))
+    return {'chars': len(summary or '')}
+
+
+@stage('translate', requires=lambda lang: [stage_key('summarize')])
+def translate(audio_file_id, lang):
+    _, transcript, summary, _ = _load_texts(audio_file_id)
+    try:
+        translation.translate_texts([transcript, summary], lang)
+    except translation.TranslationUnavailable as e:
+        # Not worth failing over: render falls back to the untranslated export
+        return {'lang': lang, 'untranslated': True, 'error': str(e)}
+    return {'lang': lang, 'transcript_hash': translation.text_hash(transcript), 'summary_hash': translation.text_hash(summary)}
+
+
+def _render_requires(fmt, lang):
+    if lang == translation.TRANSLATION_SOURCE_LANG:
+        return [stage_key('summarize')]
+    return [stage_key('summarize'), stage_key('translate', lang)]
+
+
+@stage('render', requires=_render_requires)
+def render(audio_file_id, fmt, lang):
+    title, transcript, summary, _ = _load_texts(audio_file_id)
+    digest = exports.content_hash(title, summary, transcript)
+    path = exports.cache_path(exports.EXPORT_CACHE_DIR, audio_file_id, fmt, lang, digest)
+    if exports.lookup(path):
+        return {'path': path, 'etag': exports.etag(audio_file_id, fmt, lang, digest)}
+    try:
+        # Served from translation_cache, filled by the translate stage
+        translated_transcript, translated_summary = translation.translate_texts([transcript, summary], lang)
+    except translation.TranslationUnavailable as e:
+        # Export the original text, cached under the source language so it
+        # isn't mistaken for a translation once a backend is available again
+        source = translation.TRANSLATION_SOURCE_LANG
+        path = exports.cache_path(exports.EXPORT_CACHE_DIR, audio_file_id, fmt, source, digest)
+        if not exports.lookup(path):
+            exports.render(path, fmt, title, summary, transcript)
+        return {'path': path, 'etag': exports.etag(audio_file_id, fmt, source, digest), 'untranslated': True,
+                'error': str(e)}
+    exports.render(path, fmt, title, translated_summary, translated_transcript)
+    return {'path': path, 'etag': exports.etag(audio_file_id, fmt, lang, digest)}
+
+
+@stage('diarize')
+def diarize(audio_file_id):
+    with db_cursor() as cur:
+        cur.execute("SELECT filename FROM audio_files WHERE id = %s", (audio_file_id,))
+        filename = cur.fetchone()[0]
+        cur.execute("""
+            SELECT id, start_ms, end_ms FROM transcript_segments
+            WHERE audio_file_id = %s ORDER BY seq
+        """, (audio_file_id,))
+        rows = cur.fetchall()
+    # Reuses the decoded artifact written by the transcription job
+    audio = preprocessing.load_pcm(os.path.join(uploads.UPLOAD_FOLDER, filename))
+    started = time.perf_counter()
+    speakers, stats = diarization.diarize(audio, [{'start': r[1] / 1000, 'end': r[2] / 1000} for r in rows])
+    seconds = time.perf_counter() - started
+    with db_cursor() as cur:
+        cur.executemany(
+            "UPDATE transcript_segments SET speaker = %s WHERE id = %s",
+            [(speaker, row[0]) for speaker, row in zip(speakers, rows)]
+        )
+    audio_minutes = len(audio) / preprocessing.SAMPLE_RATE / 60
+    stats['seconds_per_audio_minute'] = round(seconds / audio_minutes, 3) if audio_minutes else None
+    return stats
+
+
+def _stage_failed(job, error):
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE pipeline_stages SET status = 'failed', error = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE audio_file_id = %s AND stage = %s
+        """, (error, job['audio_file_id'], job['payload']['stage']))
+
+
+@jobs.handler('stage', on_failure=_stage_failed)
+def run_stage(job):
+    audio_file_id = job['audio_file_id']
+    key = job['payload']['stage']
+    name, params = _parse(key)
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE pipeline_stages SET status = 'running', started_at = CURRENT_TIMESTAMP
+            WHERE audio_file_id = %s AND stage = %s
+        """, (audio_file_id, key))
+
+    started_at = time.time()
+    started = time.perf_counter()
+    with metrics.span(name, audio_file_id=audio_file_id, stage=key):
+        artifact = _stages[name]['run'](audio_file_id, *params)
+    seconds = time.perf_counter() - started
+
+    with db_cursor() as cur:
+        record(cur, audio_file_id, key, started_at, seconds, artifact)
+        _enqueue_ready(cur, audio_file_id)
+    print(f"Stage {key} for file_id {audio_file_id} finished in {seconds:.2f}s")
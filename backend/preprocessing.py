@@ -0,0 +1,139 @@
+# backend/preprocessing.py
+# Audio preprocessing in front of Whisper. Each upload is decoded once (via
+# ffmpeg) to 16 kHz mono float32 and kept next to the blob as a .npy artifact,
+# which later runs and stages memory-map instead of decoding again. An
+# energy-based VAD then drops the silent stretches so the model only sees
+# speech; a Timeline maps timestamps in the trimmed audio back to the file.
+import os
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # what Whisper expects
+ARTIFACT_SUFFIX = '.16k.npy'
+
+VAD_ENABLED = os.getenv('VAD_ENABLED', '1') == '1'
+VAD_FRAME_MS = int(os.getenv('VAD_FRAME_MS', '30'))
+VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', '-45'))  # absolute floor, dBFS
+VAD_NOISE_MARGIN_DB = float(os.getenv('VAD_NOISE_MARGIN_DB', '12'))  # above the estimated noise floor
+VAD_MIN_SILENCE_MS = int(os.getenv('VAD_MIN_SILENCE_MS', '600'))  # shorter pauses are kept
+VAD_PAD_MS = int(os.getenv('VAD_PAD_MS', '200'))  # kept around each speech region
+
+
+def vad_params():
+    """The settings that change what the model sees (part of the result cache key)."""
+    if not VAD_ENABLED:
+        return None
+    return {
+        'frame_ms': VAD_FRAME_MS,
+        'threshold_db': VAD_THRESHOLD_DB,
+        'noise_margin_db': VAD_NOISE_MARGIN_DB,
+        'min_silence_ms': VAD_MIN_SILENCE_MS,
+        'pad_ms': VAD_PAD_MS,
+    }
+
+
+def artifact_path(file_path):
+    return os.path.splitext(file_path)[0] + ARTIFACT_SUFFIX
+
+
+def load_pcm(file_path):
+    """16 kHz mono float32 samples for file_path, memory-mapped from the
+    decoded artifact (created on first use)."""
+    path = artifact_path(file_path)
+    if not os.path.exists(path):
+        import whisper
+        audio = whisper.load_audio(file_path)
+        # Write under a temporary name so a concurrent reader never maps a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, audio)
+        os.replace(tmp_path, path)
+    return np.load(path, mmap_mode='r')
+
+
+def frame_energy_db(audio, frame_ms=VAD_FRAME_MS):
+    """Mean energy (dBFS) of consecutive non-overlapping frames."""
+    frame = int(SAMPLE_RATE * frame_ms / 1000)
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = np.asarray(audio[:count * frame], dtype=np.float32).reshape(count, frame)
+    power = np.einsum('ij,ij->i', frames, frames) / frame
+    return 10 * np.log10(power + 1e-10), frame
+
+
+def speech_regions(audio):
+    """[(start, end)] sample ranges that contain speech, padded and with short
+    pauses merged. Returns the whole file as one region if VAD is disabled."""
+    total = len(audio)
+    if not VAD_ENABLED or total == 0:
+        return [(0, total)]
+
+    energy, frame = frame_energy_db(audio)
+    if len(energy) == 0:
+        return [(0, total)]
+    # Adaptive threshold: a margin over the quietest tenth of the file, but
+    # never below the absolute floor (digital silence would otherwise pass)
+    threshold = max(VAD_THRESHOLD_DB, np.percentile(energy, 10) + VAD_NOISE_MARGIN_DB)
+    speech = energy > threshold
+    if not speech.any():
+        return []
+
+    # Run boundaries of the boolean mask, in frames
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Merge runs separated by pauses shorter than the minimum silence
+    min_gap = max(1, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] >= min_gap))
+    starts = starts[keep]
+    ends = np.concatenate((ends[np.flatnonzero(keep)[1:] - 1], ends[-1:]))
+
+    pad = int(SAMPLE_RATE * VAD_PAD_MS / 1000)
+    regions = []
+    for start, end in zip(starts * frame - pad, ends * frame + pad):
+        start, end = max(0, int(start)), min(total, int(end))
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+class Timeline:
+    """Maps times in audio concatenated from `regions` back to the original file."""
+
+    def __init__(self, regions, total_samples):
+        self.total_samples = total_samples
+        lengths = np.array([end - start for start, end in regions], dtype=np.int64)
+        self._compact_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(regions) else np.zeros(0, np.int64)
+        self._original_starts = np.array([start for start, _ in regions], dtype=np.int64)
+        self.kept_samples = int(lengths.sum())
+
+    @property
+    def duration(self):
+        return self.total_samples / SAMPLE_RATE
+
+    @property
+    def kept_ratio(self):
+        return self.kept_samples / self.total_samples if self.total_samples else 1.0
+
+    def to_original(self, seconds):
+        if len(self._compact_starts) == 0:
+            return seconds
+        sample = int(round(seconds * SAMPLE_RATE))
+        i = max(0, int(np.searchsorted(self._compact_starts, sample, side='right')) - 1)
+        return (self._original_starts[i] + sample - self._compact_starts[i]) / SAMPLE_RATE
+
+
+def trim_silence(audio):
+    """Returns (speech-only audio, Timeline). The audio is only copied when
+    something is actually cut."""
+    regions = speech_regions(audio)
+    timeline = Timeline(regions, len(audio))
+    if regions == [(0, len(audio))]:
+        return audio, timeline
+    if not regions:
+        return np.zeros(0, dtype=np.float32), timeline
+    return np.concatenate([audio[start:end] for start, end in regions]), timeline
@@ -0,0 +1,41 @@
+# backend/subtitles.py
+# SRT and WebVTT subtitles generated straight from transcript_segments rows,
+# one cue per segment, prefixed with the speaker once the diarization stage
+# has labeled it. Cues are yielded one at a time so a long transcript is
+# streamed to the client instead of built in memory.
+
+FORMATS = {
+    'srt': 'application/x-subrip; charset=utf-8',
+    'vtt': 'text/vtt; charset=utf-8',
+}
+
+
+def timestamp(ms, decimal_sep):
+    hours, ms = divmod(int(ms), 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_sep}{ms:03d}"
+
+
+def speaker_name(speaker):
+    return f"Speaker {speaker + 1}"
+
+
+def _cue_text(text, speaker, fmt):
+    # A blank line would end the cue early
+    text = ' '.join((text or '').split())
+    if speaker is None:
+        return text
+    if fmt == 'vtt':
+        return f"<v {speaker_name(speaker)}>{text}"
+    return f"{speaker_name(speaker)}: {text}"
+
+
+def render(rows, fmt):
+    """Yield the subtitle file for rows of (start_ms, end_ms, text, speaker) in order."""
+    sep = '.' if fmt == 'vtt' else ','
+    if fmt == 'vtt':
+        yield "WEBVTT\n\n"
+    for number, (start_ms, end_ms, text, speaker) in enumerate(rows, 1):
+        cue = f"{timestamp(start_ms, sep)} --> {timestamp(max(end_ms, start_ms), sep)}\n{_cue_text(text, speaker, fmt)}\n\n"
+        yield cue if fmt == 'vtt' else f"{number}\n{cue}"
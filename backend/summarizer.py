@@ -0,0 +1,197 @@
+# backend/summarizer.py
+# Shared BART summarizer plus a content-hash keyed summary cache, so a
+# transcript is only summarized again when its text or the summary
+# parameters change.
+#
+# Long transcripts are summarized map-reduce style: split into sentence-aligned
+# chunks that fit BART's input window, summarize the chunks in batches, then
+# summarize the joined chunk summaries (repeating until they fit one window).
+import hashlib
+import json
+import os
+import re
+import resource
+import threading
+import time
+
+from db import db_cursor
+from model_registry import registry
+
+SUMMARY_MODEL = os.getenv('SUMMARY_MODEL', 'facebook/bart-large-cnn')
+SUMMARY_DEVICE = os.getenv('SUMMARY_DEVICE', 'cpu')
+SUMMARY_MAX_LENGTH = int(os.getenv('SUMMARY_MAX_LENGTH', '60'))
+SUMMARY_MIN_LENGTH = int(os.getenv('SUMMARY_MIN_LENGTH', '20'))
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '900'))  # BART accepts 1024
+SUMMARY_CHUNK_MAX_LENGTH = int(os.getenv('SUMMARY_CHUNK_MAX_LENGTH', '120'))
+SUMMARY_CHUNK_MIN_LENGTH = int(os.getenv('SUMMARY_CHUNK_MIN_LENGTH', '30'))
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', '4'))
+SUMMARY_MAX_ROUNDS = 4
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+_stats_lock = threading.Lock()
+_stats = {'runs': 0, 'chunks': 0, 'input_tokens': 0, 'seconds': 0.0, 'peak_rss_bytes': 0}
+
+
+def _load_summarizer(name, device, precision):
+    from transformers import pipeline
+    return pipeline('summarization', model=name, device=-1 if device == 'cpu' else device)
+
+
+registry.register_loader('summarizer', _load_summarizer)
+
+
+def summary_params():
+    return {
+        'model': SUMMARY_MODEL,
+        'max_length': SUMMARY_MAX_LENGTH,
+        'min_length': SUMMARY_MIN_LENGTH,
+        'chunk_tokens': SUMMARY_CHUNK_TOKENS,
+        'chunk_max_length': SUMMARY_CHUNK_MAX_LENGTH,
+        'chunk_min_length': SUMMARY_CHUNK_MIN_LENGTH,
+        'do_sample': False,
+    }
+
+
+def params_key(params=None):
+    encoded = json.dumps(params or summary_params(), sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def content_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def fallback_summary(transcript):
+    transcript = transcript or ''
+    return transcript[:200] + ('...' if len(transcript) > 200 else '')
+
+
+def _peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def split_into_chunks(text, tokenizer, max_tokens=SUMMARY_CHUNK_TOKENS):
+    """Sentence-aligned chunks of at most max_tokens tokens each.
+
+    A single sentence longer than max_tokens is cut on token boundaries.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if not sentence:
+            continue
+        ids = tokenizer.encode(sentence, add_special_tokens=False)
+        if len(ids) > max_tokens:
+            if current:
+                chunks.append(' '.join(current))
+                current, current_tokens = [], 0
+            for start in range(0, len(ids), max_tokens):
+                chunks.append(tokenizer.decode(ids[start:start + max_tokens]))
+            continue
+        if current_tokens + len(ids) > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += len(ids)
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def _summarize_batch(pipe, texts, max_length, min_length):
+    outputs = pipe(
+        texts,
+        max_length=max_length,
+        min_length=min_length,
+        do_sample=False,
+        truncation=True,
+        batch_size=SUMMARY_BATCH_SIZE
+    )
+    return [o['summary_text'] for o in outputs]
+
+
+def summarize(transcript):
+    """Run the model (map-reduce for long input); no caching. Raises if the model is unavailable.
+
+    Returns (summary, stats) where stats has chunk counts, tokens/sec and peak RSS.
+    """
+    params = summary_params()
+    started = time.perf_counter()
+    with registry.use('summarizer', params['model'], SUMMARY_DEVICE) as pipe:
+        tokenizer = pipe.tokenizer
+        input_tokens = len(tokenizer.encode(transcript, add_special_tokens=False))
+        text = transcript
+        chunk_count = 0
+        rounds = 0
+        chunks = split_into_chunks(text, tokenizer, params['chunk_tokens'])
+        while len(chunks) > 1 and rounds < SUMMARY_MAX_ROUNDS:
+            chunk_count += len(chunks)
+            rounds += 1
+            summaries = _summarize_batch(pipe, chunks, params['chunk_max_length'], params['chunk_min_length'])
+            text = ' '.join(summaries)
+            chunks = split_into_chunks(text, tokenizer, params['chunk_tokens'])
+        summary = _summarize_batch(pipe, [text], params['max_length'], params['min_length'])[0]
+
+    seconds = time.perf_counter() - started
+    stats = {
+        'input_tokens': input_tokens,
+        'chunks': chunk_count or 1,
+        'reduce_rounds': rounds,
+        'seconds': round(seconds, 3),
+        'tokens_per_second': round(input_tokens / seconds, 1) if seconds else None,
+        'peak_rss_bytes': _peak_rss_bytes(),
+    }
+    with _stats_lock:
+        _stats['runs'] += 1
+        _stats['chunks'] += stats['chunks']
+        _stats['input_tokens'] += input_tokens
+        _stats['seconds'] += seconds
+        _stats['peak_rss_bytes'] = max(_stats['peak_rss_bytes'], stats['peak_rss_bytes'])
+    print(f"Summarized {input_tokens} tokens in {stats['chunks']} chunk(s), "
+          f"{stats['seconds']}s ({stats['tokens_per_second']} tok/s, peak RSS {stats['peak_rss_bytes'] / 2**20:.0f} MB)")
+    return summary, stats
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot['seconds'] = round(snapshot['seconds'], 3)
+    snapshot['tokens_per_second'] = round(snapshot['input_tokens'] / snapshot['seconds'], 1) if snapshot['seconds'] else None
+    return snapshot
+
+
+def get_summary(transcript):
+    """Cached summary for transcript, computing and storing it on a miss.
+
+    Uses short-lived pooled connections so none is held while the model runs.
+    """
+    digest = content_hash(transcript)
+    key = params_key()
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT summary FROM summary_cache
+            WHERE content_hash = %s AND params_key = %s
+        """, (digest, key))
+        row = cur.fetchone()
+    if row:
+        return row[0]
+
+    if not (transcript or '').strip():
+        return ''
+    try:
+        summary, _ = summarize(transcript)
+    except Exception as e:
+        # Don't cache the fallback; a later call may have a working model.
+        print(f"Summarization failed, using excerpt: {str(e)}")
+        return fallback_summary(transcript)
+
+    with db_cursor() as cur:
+        cur.execute("""
+            INSERT INTO summary_cache (content_hash, params_key, summary)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (content_hash, params_key) DO NOTHING
+        """, (digest, key, summary))
+    return summary
@@ -0,0 +1,106 @@
+# backend/tasks.py
+# Job handlers run by the worker pool in jobs.py. The post-transcription
+# stages (summary, translation, exports) are registered by pipeline.py.
+import time
+
+import batching
+import jobs
+import metrics
+import model_registry
+import parallel
+import pipeline
+import preprocessing
+import transcription
+from db import db_cursor
+
+_rtf = metrics.histogram(
+    'voicevista_transcribe_rtf', 'Real-time factor of transcription (seconds spent per second of audio)', ('model',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+)
+
+
+def _mark_failed(job, error):
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE audio_files
+            SET status = 'failed'
+            WHERE id = %s
+        """, (job['audio_file_id'],))
+
+
+def _store_window(file_id, first_seq, segments, progress):
+    with db_cursor() as cur:
+        for i, seg in enumerate(segments):
+            cur.execute("""
+                INSERT INTO transcript_segments (audio_file_id, seq, start_ms, end_ms, text)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (file_id, first_seq + i, int(seg['start'] * 1000), int(seg['end'] * 1000), seg['text']))
+        cur.execute("UPDATE audio_files SET progress = %s WHERE id = %s", (progress, file_id))
+
+
+@jobs.handler('transcribe', on_failure=_mark_failed)
+def transcribe(job):
+    file_id = job['audio_file_id']
+    file_path = job['payload']['file_path']
+    model_name = job['payload'].get('model') or model_registry.WHISPER_MODEL
+    print(f"Starting transcription for file_id: {file_id} (attempt {job['attempts']})")
+    started_at = time.time()
+    started = time.perf_counter()
+
+    # A retry starts over; drop whatever the previous attempt persisted
+    with db_cursor() as cur:
+        cur.execute("DELETE FROM transcript_segments WHERE audio_file_id = %s", (file_id,))
+        cur.execute("UPDATE audio_files SET progress = 0 WHERE id = %s", (file_id,))
+
+    # Decoded once to a memory-mapped artifact; silence is cut before the model runs
+    with metrics.span('decode', audio_file_id=file_id):
+        audio, timeline = transcription.load_audio(file_path)
+    print(f"file_id {file_id}: {timeline.kept_ratio:.0%} of {timeline.duration:.0f}s kept after VAD")
+    next_seq = [0]
+
+    def on_window(segments, progress):
+        _store_window(file_id, next_seq[0], segments, progress)
+        next_seq[0] += len(segments)
+
+    fp16 = model_registry.WHISPER_PRECISION == 'fp16'
+    transcribe_started = time.perf_counter()
+    with metrics.span('transcribe', audio_file_id=file_id, model=model_name) as span:
+        if batching.eligible(audio):
+            # Short clip: decoded together with other clips in flight in one batched forward pass
+            segments = [
+                {'start': timeline.to_original(seg['start']), 'end': timeline.to_original(seg['end']), 'text': seg['text']}
+                for seg in batching.batcher.transcribe(audio, fp16, model_name)
+            ]
+            on_window(segments, 100)
+            result = {'text': ' '.join(seg['text'] for seg in segments), 'segments': segments, 'duration': timeline.duration}
+        elif parallel.enabled_for(audio):
+            # Long recording: split on silence and transcribe the parts across processes
+            result = parallel.transcribe_parallel(audio, on_window, fp16=fp16, timeline=timeline, model_name=model_name)
+            print(f"file_id {file_id}: {result['parts']} parts, {len(audio) / preprocessing.SAMPLE_RATE:.0f}s "
+                  f"of speech in {result['wall_seconds']:.1f}s wall-clock")
+        else:
+            with model_registry.whisper_model(model_name) as model:
+                result = transcription.transcribe_incremental(model, audio, on_window, fp16=fp16, timeline=timeline)
+        span['audio_seconds'] = round(timeline.duration, 3)
+    if timeline.duration:
+        _rtf.observe((time.perf_counter() - transcribe_started) / timeline.duration, model=model_name)
+    transcript = result["text"]
+
+    # Save the transcript, cache the result for later uploads of the same
+    # audio, and hand off to the post-transcription pipeline (summary,
+    # translation, export), which runs as separate jobs
+    with db_cursor() as cur:
+        cur.execute("""
+            UPDATE audio_files
+            SET transcript = %s, summary = NULL, status = 'completed', progress = 100, duration_seconds = %s
+            WHERE id = %s
+            RETURNING content_sha256
+        """, (transcript, result['duration'], file_id))
+        row = cur.fetchone()
+        if row and row[0]:
+            transcription.store_result(cur, row[0], transcription.decode_options(model_name), result, None)
+        pipeline.record(cur, file_id, 'transcribe', started_at, time.perf_counter() - started,
+                        {'model': model_name, 'audio_seconds': result['duration']})
+        # Settings snapshot from the upload; jobs queued before it existed look them up
+        pipeline.start(cur, file_id, job['payload'].get('settings'))
+    print(f"Transcription completed for file_id: {file_id}")
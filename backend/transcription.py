@@ -0,0 +1,132 @@
+# backend/transcription.py
+# Window-by-window Whisper decoding. The audio is decoded once, then fed to
+# the model in fixed windows so segments (with absolute timestamps) and a
+# progress percentage can be reported as each window finishes instead of only
+# when the whole file is done.
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import model_registry
+import preprocessing
+
+TRANSCRIBE_WINDOW_SECONDS = int(os.getenv('TRANSCRIBE_WINDOW_SECONDS', '30'))
+PROMPT_CHARS = 200  # tail of the previous window's text, used as context for the next
+
+
+def load_audio(file_path):
+    """Speech-only 16 kHz mono float32 samples and the Timeline that maps
+    their timestamps back to the file (see preprocessing.py)."""
+    return preprocessing.trim_silence(preprocessing.load_pcm(file_path))
+
+
+def transcribe_incremental(model, audio, on_window=None, fp16=False, window_seconds=TRANSCRIBE_WINDOW_SECONDS,
+                           timeline=None, **decode_options):
+    """Transcribe `audio` (16 kHz float32 samples) one window at a time.
+
+    on_window(segments, progress) is called after every window with that
+    window's segments ({'start', 'end', 'text'}, seconds from the start of the
+    file) and the percentage of audio processed so far. When `audio` has had
+    silence cut out, pass its `timeline` so timestamps refer to the original.
+
+    Returns {'text', 'segments', 'duration'}.
+    """
+    SAMPLE_RATE = preprocessing.SAMPLE_RATE
+    to_original = timeline.to_original if timeline else (lambda seconds: seconds)
+
+    total = len(audio)
+    window = max(1, int(window_seconds * SAMPLE_RATE))
+    all_segments = []
+    prompt = None
+
+    for offset in range(0, total, window):
+        # Copy the window out of the (possibly read-only, memory-mapped) samples
+        chunk = np.array(audio[offset:offset + window], dtype=np.float32)
+        result = model.transcribe(
+            chunk,
+            fp16=fp16,
+            initial_prompt=prompt,
+            condition_on_previous_text=True,
+            **decode_options
+        )
+        base = offset / SAMPLE_RATE
+        chunk_end = (offset + len(chunk)) / SAMPLE_RATE
+        segments = []
+        for seg in result['segments']:
+            text = seg['text'].strip()
+            if not text:
+                continue
+            segments.append({
+                'start': to_original(base + seg['start']),
+                'end': to_original(min(base + seg['end'], chunk_end)),
+                'text': text
+            })
+        all_segments.extend(segments)
+
+        window_text = result['text'].strip()
+        if window_text:
+            prompt = window_text[-PROMPT_CHARS:]
+
+        if on_window:
+            on_window(segments, min(100, int((offset + len(chunk)) * 100 / total)))
+
+    return {
+        'text': ' '.join(s['text'] for s in all_segments),
+        'segments': all_segments,
+        'duration': timeline.duration if timeline else total / SAMPLE_RATE
+    }
+
+
+# --- Result cache ---
+# Results are keyed by (audio SHA-256, decode options) so a re-upload of the
+# same audio completes without running Whisper again.
+
+def decode_options(model=None, language=None):
+    return {
+        'model': model or model_registry.WHISPER_MODEL,
+        'precision': model_registry.WHISPER_PRECISION,
+        'language': language,
+        'window_seconds': TRANSCRIBE_WINDOW_SECONDS,
+        'vad': preprocessing.vad_params(),
+    }
+
+
+def options_key(options):
+    encoded = json.dumps(options, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def lookup_result(cur, audio_sha256, options):
+    cur.execute("""
+        SELECT transcript, summary, segments, duration_seconds
+        FROM transcription_results
+        WHERE audio_sha256 = %s AND options_key = %s
+    """, (audio_sha256, options_key(options)))
+    row = cur.fetchone()
+    if not row:
+        return None
+    return {'text': row[0], 'summary': row[1], 'segments': row[2] or [], 'duration': row[3]}
+
+
+def store_result(cur, audio_sha256, options, result, summary):
+    cur.execute("""
+        INSERT INTO transcription_results
+            (audio_sha256, options_key, model, language, transcript, summary, segments, duration_seconds)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (audio_sha256, options_key) DO UPDATE
+        SET transcript = EXCLUDED.transcript, summary = EXCLUDED.summary,
+            segments = EXCLUDED.segments, duration_seconds = EXCLUDED.duration_seconds
+    """, (
+        audio_sha256, options_key(options), options['model'], options['language'],
+        result['text'], summary, json.dumps(result['segments']), result['duration']
+    ))
+
+
+def copy_segments(cur, audio_file_id, segments):
+    for seq, seg in enumerate(segments):
+        cur.execute("""
+            INSERT INTO transcript_segments (audio_file_id, seq, start_ms, end_ms, text)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (audio_file_id, seq, int(seg['start'] * 1000), int(seg['end'] * 1000), seg['text']))
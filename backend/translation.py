@@ -0,0 +1,187 @@
+# backend/translation.py
+# Translation for exports, with pluggable backends and a persistent cache.
+#
+# Backends are tried in TRANSLATION_BACKENDS order: 'marian' runs a local
+# MarianMT model (through the model registry, no network), 'google' calls
+# Google Translate through deep-translator. Texts are split into paragraphs
+# and sentence-aligned chunks that fit the model's input, and all chunks of a
+# request are translated in length-sorted batches. Results are cached in
+# translation_cache by (text hash, target language), so the same text is
+# never translated twice into the same language.
+import hashlib
+import os
+import re
+import threading
+import time
+
+from db import db_cursor
+from model_registry import registry
+from summarizer import split_into_chunks
+
+TRANSLATION_BACKENDS = [b.strip() for b in os.getenv('TRANSLATION_BACKENDS', 'marian,google').split(',') if b.strip()]
+TRANSLATION_SOURCE_LANG = os.getenv('TRANSLATION_SOURCE_LANG', 'en')
+TRANSLATION_DEVICE = os.getenv('TRANSLATION_DEVICE', 'cpu')
+TRANSLATION_MODEL_TEMPLATE = os.getenv('TRANSLATION_MODEL_TEMPLATE', 'Helsinki-NLP/opus-mt-{source}-{target}')
+TRANSLATION_CHUNK_TOKENS = int(os.getenv('TRANSLATION_CHUNK_TOKENS', '400'))  # Marian accepts 512
+TRANSLATION_BATCH_SIZE = int(os.getenv('TRANSLATION_BATCH_SIZE', '8'))
+GOOGLE_CHUNK_CHARS = 4500  # Google Translate rejects requests over 5000 characters
+
+# Targets whose opus-mt model doesn't follow the template
+MARIAN_MODELS = {
+    'ja': 'Helsinki-NLP/opus-mt-en-jap',
+    'ko': 'Helsinki-NLP/opus-mt-tc-big-en-ko',
+    'co': 'Helsinki-NLP/opus-mt-en-es',  # Colombian Spanish
+}
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+_stats_lock = threading.Lock()
+_stats = {'cache_hits': 0, 'cache_misses': 0, 'chunks': 0, 'seconds': 0.0, 'backends': {}}
+
+
+class TranslationUnavailable(Exception):
+    pass
+
+
+class _MarianModel:
+    def __init__(self, name, device):
+        from transformers import MarianMTModel, MarianTokenizer
+        self.tokenizer = MarianTokenizer.from_pretrained(name)
+        self.model = MarianMTModel.from_pretrained(name).to(device)
+        self.model.eval()
+        self.device = device
+
+
+def _load_translator(name, device, precision):
+    return _MarianModel(name, device)
+
+
+registry.register_loader('translator', _load_translator)
+
+
+def marian_model_name(target, source=TRANSLATION_SOURCE_LANG):
+    if source == TRANSLATION_SOURCE_LANG and target in MARIAN_MODELS:
+        return MARIAN_MODELS[target]
+    return TRANSLATION_MODEL_TEMPLATE.format(source=source, target=target)
+
+
+def _paragraph_chunks(texts, split):
+    """Flatten texts into (text index, paragraph index, chunk) with split(paragraph) -> chunks."""
+    pieces = []
+    for t, text in enumerate(texts):
+        for p, paragraph in enumerate(_PARAGRAPH_BREAK.split(text or '')):
+            for chunk in split(paragraph):
+                pieces.append((t, p, chunk))
+    return pieces
+
+
+def _reassemble(texts, pieces, translated):
+    paragraphs = [{} for _ in texts]
+    for (t, p, _), out in zip(pieces, translated):
+        paragraphs[t].setdefault(p, []).append(out)
+    return ['\n\n'.join(' '.join(paragraphs[t][p]) for p in sorted(paragraphs[t])) for t in range(len(texts))]
+
+
+def _translate_marian(texts, target):
+    import torch
+    with registry.use('translator', marian_model_name(target), TRANSLATION_DEVICE) as marian:
+        tokenizer = marian.tokenizer
+        pieces = _paragraph_chunks(texts, lambda p: split_into_chunks(p, tokenizer, TRANSLATION_CHUNK_TOKENS) if p.strip() else [])
+        # Batch similar lengths together to keep padding down
+        order = sorted(range(len(pieces)), key=lambda i: len(pieces[i][2]))
+        translated = [None] * len(pieces)
+        for start in range(0, len(order), TRANSLATION_BATCH_SIZE):
+            batch = order[start:start + TRANSLATION_BATCH_SIZE]
+            inputs = tokenizer([pieces[i][2] for i in batch], return_tensors='pt', padding=True, truncation=True)
+            inputs = {k: v.to(marian.device) for k, v in inputs.items()}
+            with torch.inference_mode():
+                outputs = marian.model.generate(**inputs)
+            for i, text in zip(batch, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                translated[i] = text
+    return _reassemble(texts, pieces, translated), len(pieces)
+
+
+def _split_chars(paragraph, limit=GOOGLE_CHUNK_CHARS):
+    chunks, current = [], ''
+    for sentence in re.split(r'(?<=[.!?])\s+', paragraph.strip()):
+        while len(sentence) > limit:
+            chunks.append(sentence[:limit])
+            sentence = sentence[limit:]
+        if current and len(current) + len(sentence) + 1 > limit:
+            chunks.append(current)
+            current = ''
+        current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _translate_google(texts, target):
+    from deep_translator import GoogleTranslator
+    translator = GoogleTranslator(source='auto', target=target)
+    pieces = _paragraph_chunks(texts, _split_chars)
+    return _reassemble(texts, pieces, [translator.translate(chunk) or '' for _, _, chunk in pieces]), len(pieces)
+
+
+BACKENDS = {'marian': _translate_marian, 'google': _translate_google}
+
+
+def _run_backends(texts, target):
+    errors = []
+    for name in TRANSLATION_BACKENDS:
+        started = time.perf_counter()
+        try:
+            translated, chunks = BACKENDS[name](texts, target)
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+            continue
+        with _stats_lock:
+            _stats['chunks'] += chunks
+            _stats['seconds'] += time.perf_counter() - started
+            _stats['backends'][name] = _stats['backends'].get(name, 0) + 1
+        return translated, name
+    raise TranslationUnavailable('; '.join(errors) or 'No translation backend configured')
+
+
+def text_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def translate_texts(texts, target):
+    """Translate each of `texts` into `target`, from the cache where possible.
+
+    Misses are translated together in one backend call. Raises
+    TranslationUnavailable if no backend could translate them.
+    """
+    if target == TRANSLATION_SOURCE_LANG:
+        return list(texts)
+    digests = [text_hash(text) for text in texts]
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT text_hash, translated FROM translation_cache
+            WHERE text_hash = ANY(%s) AND target_lang = %s
+        """, (list(set(digests)), target))
+        cached = dict(cur.fetchall())
+
+    missing = [i for i, digest in enumerate(digests) if digest not in cached and (texts[i] or '').strip()]
+    with _stats_lock:
+        _stats['cache_hits'] += len(texts) - len(missing)
+        _stats['cache_misses'] += len(missing)
+    if missing:
+        translated, backend = _run_backends([texts[i] for i in missing], target)
+        with db_cursor() as cur:
+            for i, text in zip(missing, translated):
+                cached[digests[i]] = text
+                cur.execute("""
+                    INSERT INTO translation_cache (text_hash, target_lang, backend, translated)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (text_hash, target_lang) DO NOTHING
+                """, (digests[i], target, backend, text))
+    return [cached.get(digest, text) for digest, text in zip(digests, texts)]
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats, backends=dict(_stats['backends']))
+    snapshot['seconds'] = round(snapshot['seconds'], 3)
+    return snapshot
@@ -0,0 +1,138 @@
+# backend/uploads.py
+# Streaming ingest for audio uploads. Request bodies are copied to disk in
+# fixed-size chunks (never held in memory as a whole), the size limit is
+# enforced as soon as it is crossed, and the SHA-256 is computed in the same
+# pass. Also holds the helpers for resumable (tus-style offset) uploads.
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_MB', '50')) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_KB', '1024')) * 1024
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+UPLOAD_FOLDER = 'uploads'
+PARTIAL_DIR = '.partial'
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit):
+        super().__init__(f"Upload exceeds the {limit // (1024 * 1024)}MB limit")
+        self.limit = limit
+
+
+def copy_stream(stream, out, limit, hasher=None, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Copy stream into the open file `out` chunk by chunk.
+
+    Raises UploadTooLarge as soon as more than `limit` bytes have been read.
+    Returns the number of bytes written.
+    """
+    written = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        written += len(chunk)
+        if written > limit:
+            raise UploadTooLarge(limit)
+        if hasher is not None:
+            hasher.update(chunk)
+        out.write(chunk)
+    return written
+
+
+def spool_to_file(stream, dest_path, limit=UPLOAD_MAX_BYTES):
+    """Stream a request body to dest_path, hashing as it goes.
+
+    Writes to a temporary name and renames on success so a half-written file
+    never appears under dest_path. Returns (size, sha256 hex).
+    """
+    tmp_path = dest_path + '.part'
+    hasher = hashlib.sha256()
+    try:
+        with open(tmp_path, 'wb') as out:
+            size = copy_stream(stream, out, limit, hasher)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size, hasher.hexdigest()
+
+
+def hash_file(path, chunk_size=UPLOAD_CHUNK_SIZE):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def partial_path(upload_folder, session_id):
+    return os.path.join(upload_folder, PARTIAL_DIR, session_id)
+
+
+class UploadBusy(Exception):
+    pass
+
+
+class UploadInterrupted(Exception):
+    """The request body stopped early; `written` bytes of it are on disk."""
+
+    def __init__(self, written):
+        super().__init__(f"Upload interrupted after {written} bytes")
+        self.written = written
+
+
+@contextmanager
+def open_partial(upload_folder, session_id):
+    """Open the session's partial file with an exclusive lock, so two PATCH
+    requests for the same upload (from any worker process) can't interleave."""
+    path = partial_path(upload_folder, session_id)
+    with open(path, 'r+b') as out:
+        try:
+            fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusy(session_id)
+        try:
+            yield out
+        finally:
+            fcntl.flock(out.fileno(), fcntl.LOCK_UN)
+
+
+def write_at(out, offset, stream, remaining):
+    """Write a PATCH body at `offset`; returns bytes written.
+
+    Anything past `offset` (not recorded in the session) is discarded first.
+    If the body is cut off, what did arrive is kept and reported through
+    UploadInterrupted so the caller can record it and the client resumes
+    from that byte.
+    """
+    out.truncate(offset)
+    out.seek(offset)
+    try:
+        written = copy_stream(stream, out, remaining)
+    except UploadTooLarge:
+        raise
+    except Exception as e:
+        # ClientDisconnected, socket errors: keep every byte that made it to the file
+        out.flush()
+        raise UploadInterrupted(out.tell() - offset) from e
+    out.flush()
+    return written
+
+
+def expire_sessions(cur, upload_folder):
+    """Delete upload sessions (and their partial files) older than the TTL."""
+    cur.execute("""
+        DELETE FROM upload_sessions
+        WHERE created_at < CURRENT_TIMESTAMP - make_interval(hours => %s)
+        RETURNING id
+    """, (UPLOAD_SESSION_TTL_HOURS,))
+    for (session_id,) in cur.fetchall():
+        path = partial_path(upload_folder, session_id)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,15 @@
+# backend/worker.py
+# Standalone transcription worker. Run one per box when the web processes are
+# started with START_JOB_WORKERS=0:  python worker.py
+import time
+import jobs
+import metrics
+import model_registry
+
+if __name__ == '__main__':
+    metrics.serve()  # METRICS_PORT; the web processes serve /metrics themselves
+    jobs.start_workers('tasks')
+    if jobs.JOB_WORKER_MODE != 'process':
+        model_registry.warm_default_models()
+    while True:
+        time.sleep(3600)
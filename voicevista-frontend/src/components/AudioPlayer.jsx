@@ -1,11 +1,19 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Play, Pause, SkipBack, SkipForward, Volume2 } from 'lucide-react';
+import api from '../services/api';
 
-const AudioPlayer = ({ audioUrl, transcript }) => {
+// Seconds of transcript fetched around the playhead; the next window is
+// requested when playback (or a seek) gets close to the end of this one.
+const SEGMENT_WINDOW_SECONDS = 60;
+const SEGMENT_PREFETCH_SECONDS = 10;
+
+const AudioPlayer = ({ audioUrl, transcript, transcriptionId }) => {
     const [isPlaying, setIsPlaying] = useState(false);
     const [currentTime, setCurrentTime] = useState(0);
     const [duration, setDuration] = useState(0);
+    const [segments, setSegments] = useState([]);
     const audioRef = useRef(null);
+    const loadedRange = useRef(null);
 
     useEffect(() => {
 
@@ -26,6 +34,38 @@ const AudioPlayer = ({ audioUrl, transcript }) => {
         };
     }, []);
 
+    useEffect(() => {
+        setSegments([]);
+        loadedRange.current = null;
+    }, [transcriptionId]);
+
+    // Only the segments near the playhead are fetched, never the full transcript
+    useEffect(() => {
+        if (!transcriptionId) return;
+        const range = loadedRange.current;
+        if (range && currentTime >= range.start && currentTime < range.end - SEGMENT_PREFETCH_SECONDS) return;
+        const start = Math.max(0, Math.floor(currentTime) - SEGMENT_PREFETCH_SECONDS);
+        const end = start + SEGMENT_WINDOW_SECONDS;
+        loadedRange.current = { start, end };
+        api.getTranscriptionSegments(transcriptionId, { start, end })
+            .then((data) => {
+                if (loadedRange.current && loadedRange.current.start === start) {
+                    setSegments(data.segments);
+                }
+            })
+            .catch(() => {
+                loadedRange.current = null;
+            });
+    }, [transcriptionId, currentTime]);
+
+    const activeSegment = segments.find((seg) => currentTime >= seg.start && currentTime < seg.end);
+
+    const seekTo = (time) => {
+        const audio = audioRef.current;
+        audio.currentTime = time;
+        setCurrentTime(time);
+    };
+
     const togglePlayPause = () => {
         const audio = audioRef.current;
         if (isPlaying) {
@@ -40,7 +80,7 @@ const AudioPlayer = ({ audioUrl, transcript }) => {
         const audio = audioRef.current;
         const rect = e.currentTarget.getBoundingClientRect();
         const percent = (e.clientX - rect.left) / rect.width;
-        audio.currentTime = percent * duration;
+        seekTo(percent * duration);
     };
 
     const formatTime = (time) => {
@@ -102,6 +142,21 @@ const AudioPlayer = ({ audioUrl, transcript }) => {
                 <span>{formatTime(currentTime)}</span>
                 <span>{formatTime(duration)}</span>
             </div>
+            {segments.length > 0 && (
+                <div className="mt-4 max-h-48 overflow-y-auto space-y-1 text-sm">
+                    {segments.map((seg) => (
+                        <button
+                            key={seg.seq}
+                            onClick={() => seekTo(seg.start)}
+                            className={`block w-full text-left px-2 py-1 rounded ${seg === activeSegment ? 'bg-primary-100 text-primary-800' : 'text-gray-600 hover:bg-gray-100'}`}
+                        >
+                            <span className="text-gray-400 mr-2">{formatTime(seg.start)}</span>
+                            {seg.speaker !== null && <span className="font-medium mr-1">Speaker {seg.speaker + 1}:</span>}
+                            {seg.text}
+                        </button>
+                    ))}
+                </div>
+            )}
         </div>
     );
 };
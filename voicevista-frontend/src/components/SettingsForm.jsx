@@ -8,7 +8,8 @@ import { useTheme } from '../context/ThemeContext';
 const SettingsForm = () => {
     const { user, login } = useAuth();
     const [profile, setProfile] = useState({ name: '', email: '', avatar_url: '' });
-    const [settings, setSettings] = useState({ transcription_language: 'English', voice_diarization: true, export_format: 'pdf' });
+    const [settings, setSettings] = useState({ transcription_language: 'English', voice_diarization: true, export_format: 'pdf', model_size: 'base' });
+    const [modelSizes, setModelSizes] = useState(['base']);
     const [isLoading, setIsLoading] = useState(false);
     const [hasChanges, setHasChanges] = useState(false);
     const [isUploadingAvatar, setIsUploadingAvatar] = useState(false);
@@ -31,8 +32,9 @@ const SettingsForm = () => {
         }
         const loadSettings = async () => {
             try {
-                const settingsData = await api.getUserSettings();
-                setSettings(settingsData);
+                const profileData = await api.getUserProfile();
+                setSettings(profileData.settings || {});
+                if (profileData.available_model_sizes) setModelSizes(profileData.available_model_sizes);
             } catch (error) {
                 console.error('Error loading settings:', error);
             }
@@ -106,6 +108,7 @@ const SettingsForm = () => {
                     transcription_language: settings.transcription_language,
                     voice_diarization: settings.voice_diarization,
                     export_format: settings.export_format,
+                    model_size: settings.model_size,
                 }
             };
             
@@ -201,6 +204,13 @@ const SettingsForm = () => {
                             <option>Spanish</option>
                         </select>
                     </div>
+                    <div>
+                        <label className="block text-sm font-medium mb-1" style={{ color: 'var(--theme-text)' }}>Model Size</label>
+                        <select value={settings.model_size} onChange={(e) => handleSettingsChange('model_size', e.target.value)} className="w-full px-3 py-2 border border-gray-300 rounded-lg text-sm sm:text-base" style={{ background: mode === 'dark' ? '#111' : '#fff', color: 'var(--theme-text)' }}>
+                            {modelSizes.map((size) => <option key={size} value={size}>{size}</option>)}
+                        </select>
+                        <p className="text-xs mt-1" style={{ color: 'var(--theme-text)' }}>Larger models are more accurate but take longer.</p>
+                    </div>
                     <div className="flex justify-between items-center">
                         <label className="font-medium text-sm sm:text-base" style={{ color: 'var(--theme-text)' }}>Enable Voice Diarization</label>
                         <button onClick={() => handleSettingsChange('voice_diarization', !settings.voice_diarization)} className={`relative inline-flex h-6 w-11 items-center rounded-full transition-colors`} style={{ background: settings.voice_diarization ? 'var(--theme-toggle)' : (mode === 'dark' ? '#222' : '#e5e7eb') }}>
@@ -51,12 +51,14 @@ const TranscriptionCard = ({ transcription, onViewDetails, onDelete }) => {
           >
             {transcription.status.charAt(0).toUpperCase() +
               transcription.status.slice(1)}
+            {transcription.status === "processing" && transcription.progress > 0 &&
+              ` ${transcription.progress}%`}
           </span>
         </div>
       </div>
-      {transcription.transcript && (
+      {transcription.snippet && (
         <p className="text-sm mb-4 line-clamp-2" style={{ color: 'var(--theme-text)' }}>
-          {transcription.transcript}
+          {transcription.snippet}
         </p>
       )}
       <button
@@ -12,9 +12,13 @@ export const AuthProvider = ({ children }) => {
     useEffect(() => {
         const storedToken = localStorage.getItem('token');
         const storedUser = localStorage.getItem('user');
+        const storedExpiry = localStorage.getItem('token_expires_at');
         
         try {
-            if (storedToken && storedUser) {
+            // Tokens expire; an expired one would only produce 401s, so start logged out
+            if (storedExpiry && new Date(storedExpiry) <= new Date()) {
+                localStorage.clear();
+            } else if (storedToken && storedUser) {
                 api.setAuthToken(storedToken); 
                 setUser(JSON.parse(storedUser));
             }
@@ -28,6 +32,9 @@ export const AuthProvider = ({ children }) => {
     const login = (userData) => {
         localStorage.setItem('token', userData.token);
         localStorage.setItem('user', JSON.stringify(userData.user));
+        if (userData.expires_at) {
+            localStorage.setItem('token_expires_at', userData.expires_at);
+        }
         api.setAuthToken(userData.token);
         setUser(userData.user);
     };
@@ -16,8 +16,8 @@ const Dashboard = () => {
 
   const loadTranscriptions = useCallback(async () => {
     try {
-      const data = await api.getTranscriptions();
-      setTranscriptions(data);
+      const data = await api.getTranscriptions({ limit: 20 });
+      setTranscriptions(data.items);
     } catch (error) {
       console.error('Error loading transcriptions:', error);
     } finally {
@@ -40,15 +40,33 @@ const Dashboard = () => {
     loadInitialData();
   }, [loadTranscriptions]);
 
-  // Auto-refresh if any transcription is processing
+  // Live job status pushed by the server (replaces polling the whole list)
   useEffect(() => {
-    if (transcriptions.some(t => t.status === 'processing')) {
-      const interval = setInterval(() => {
-        loadTranscriptions();
-      }, 5000);
-      return () => clearInterval(interval);
-    }
-  }, [transcriptions, loadTranscriptions]);
+    const unsubscribe = api.subscribeToJobEvents((event) => {
+      setTranscriptions(prev => {
+        const index = prev.findIndex(t => t.id === event.id);
+        if (index === -1) {
+          if (event.event !== 'created') return prev;
+          return [{
+            id: event.id,
+            title: event.title,
+            status: event.status,
+            progress: event.progress,
+            date: new Date().toISOString().split('T')[0]
+          }, ...prev];
+        }
+        const updated = [...prev];
+        updated[index] = {
+          ...updated[index],
+          status: event.status,
+          progress: event.progress,
+          ...(event.snippet ? { snippet: event.snippet } : {})
+        };
+        return updated;
+      });
+    });
+    return unsubscribe;
+  }, []);
 
   // This is the real upload function
   const handleStartTranscription = async (file) => {
@@ -57,15 +75,15 @@ const Dashboard = () => {
     try {
       const result = await api.uploadAudio(file);
       console.log('Upload successful:', result);
-      // Add the new transcription to the top of the list temporarily
-      setTranscriptions(prev => [{
+      // Add the new transcription to the top of the list; status updates
+      // arrive through the job events stream
+      setTranscriptions(prev => prev.some(t => t.id === result.file_id) ? prev : [{
           id: result.file_id,
           title: file.name,
           status: 'processing',
+          progress: 0,
           date: new Date().toISOString().split('T')[0]
       }, ...prev]);
-      // You can optionally reload all transcriptions after a delay
-      setTimeout(loadTranscriptions, 5000); // Refresh list after 5s
     } catch (error) {
       console.error('Error uploading file:', error);
       alert(`File upload failed: ${error.message}`);
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { Eye, Download, FileText, Trash2 } from 'lucide-react';
+import { Eye, Download, FileText, Trash2, Search } from 'lucide-react';
 import api from '../services/api';
 import { useTheme } from '../context/ThemeContext';
 
@@ -13,6 +13,12 @@ const HistoryPage = () => {
   const [downloadOptions, setDownloadOptions] = useState({});
   const [deletingId, setDeletingId] = useState(null);
   const [isDeletingAll, setIsDeletingAll] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
+  const [searchNextOffset, setSearchNextOffset] = useState(null);
+  const [isSearching, setIsSearching] = useState(false);
 
   const formatOptions = [
     { value: 'txt', label: 'TXT' },
@@ -47,8 +53,9 @@ const HistoryPage = () => {
 
   const loadTranscriptions = async () => {
     try {
-      const data = await api.getTranscriptions();
-      setTranscriptions(data);
+      const data = await api.getTranscriptions({ limit: 20 });
+      setTranscriptions(data.items);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Error loading transcriptions:', error);
     } finally {
@@ -56,6 +63,60 @@ const HistoryPage = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const data = await api.getTranscriptions({ limit: 20, cursor: nextCursor });
+      setTranscriptions((prev) => [...prev, ...data.items]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more transcriptions:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  const runSearch = async (offset = 0) => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      setSearchNextOffset(null);
+      return;
+    }
+    setIsSearching(true);
+    try {
+      const data = await api.searchTranscriptions(query, { limit: 20, offset });
+      setSearchResults((prev) => (offset > 0 && prev ? [...prev, ...data.items] : data.items));
+      setSearchNextOffset(data.next_offset);
+    } catch (error) {
+      console.error('Error searching transcriptions:', error);
+    } finally {
+      setIsSearching(false);
+    }
+  };
+
+  const handleSearchSubmit = (e) => {
+    e.preventDefault();
+    runSearch(0);
+  };
+
+  const clearSearch = () => {
+    setSearchQuery('');
+    setSearchResults(null);
+    setSearchNextOffset(null);
+  };
+
+  // Search highlights come back with matches wrapped in [[...]]
+  const renderHighlight = (text) =>
+    text.split(/(\[\[.*?\]\])/).map((part, i) =>
+      part.startsWith('[[') && part.endsWith(']]')
+        ? <mark key={i}>{part.slice(2, -2)}</mark>
+        : <React.Fragment key={i}>{part}</React.Fragment>
+    );
+
+  const visibleTranscriptions = searchResults ?? transcriptions;
+
   const handleViewDetails = (transcriptionId) => {
     navigate(`/transcription-result/${transcriptionId}`);
   };
@@ -93,6 +154,7 @@ const HistoryPage = () => {
         await api.deleteTranscription(id);
       }
       setTranscriptions((prev) => prev.filter((t) => t.id !== id));
+      setSearchResults((prev) => (prev ? prev.filter((t) => t.id !== id) : prev));
     } catch (error) {
       alert('Failed to delete transcription.');
     } finally {
@@ -109,6 +171,8 @@ const HistoryPage = () => {
         await api.deleteAllTranscriptions();
       }
       setTranscriptions([]);
+      setNextCursor(null);
+      clearSearch();
     } catch (error) {
       alert('Failed to delete all transcriptions.');
     } finally {
@@ -166,9 +230,40 @@ const HistoryPage = () => {
             </button>
           )}
         </div>
+        {/* Search */}
+        {transcriptions.length > 0 && (
+          <form onSubmit={handleSearchSubmit} className="mb-6 flex items-center space-x-2">
+            <input
+              type="search"
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              placeholder="Search transcripts..."
+              className="flex-1 border rounded-lg px-3 py-2 text-sm"
+              style={{ background: 'var(--theme-bg)', color: 'var(--theme-text)', borderColor: 'rgba(255,255,255,0.08)' }}
+            />
+            <button
+              type="submit"
+              disabled={isSearching}
+              className="flex items-center space-x-1 px-4 py-2 rounded-lg text-sm disabled:opacity-50"
+              style={{ background: 'var(--theme-heading)', color: '#fff' }}
+            >
+              <Search size={16} />
+              <span>{isSearching ? 'Searching...' : 'Search'}</span>
+            </button>
+            {searchResults && (
+              <button type="button" onClick={clearSearch} className="px-3 py-2 text-sm" style={{ color: 'var(--theme-heading)' }}>
+                Clear
+              </button>
+            )}
+          </form>
+        )}
         {/* Transcriptions List */}
         <div className="rounded-lg shadow-sm border" style={{ background: 'var(--theme-bg)', color: 'var(--theme-text)', borderColor: 'rgba(255,255,255,0.08)' }}>
-          {transcriptions.length === 0 ? (
+          {searchResults && searchResults.length === 0 ? (
+            <div className="text-center py-12">
+              <p style={{ color: 'var(--theme-text)' }}>No transcriptions match "{searchQuery}".</p>
+            </div>
+          ) : visibleTranscriptions.length === 0 ? (
             <div className="text-center py-12">
               <FileText className="h-16 w-16 mx-auto mb-4" style={{ color: 'var(--theme-heading)' }} />
               <h3 className="text-lg font-medium mb-2" style={{ color: 'var(--theme-heading)' }}>No transcriptions yet</h3>
@@ -185,7 +280,7 @@ const HistoryPage = () => {
             </div>
           ) : (
             <div>
-              {transcriptions.map((transcription) => (
+              {visibleTranscriptions.map((transcription) => (
                 <div key={transcription.id} className="p-6 border-b last:border-b-0" style={{ borderColor: 'rgba(255,255,255,0.08)' }}>
                   <div className="flex items-start justify-between">
                     <div className="flex-1">
@@ -198,17 +293,19 @@ const HistoryPage = () => {
                       <div className="text-sm mb-3" style={{ color: 'var(--theme-text)' }}>
                         {transcription.date}
                       </div>
-                      {/* Show summary if available */}
-                      {transcription.summary && (
-                        <div className="mb-2">
-                          <span className="font-semibold" style={{ color: 'var(--theme-heading)' }}>Summary:</span>
-                          <p className="text-sm" style={{ color: 'var(--theme-text)' }}>{transcription.summary}</p>
+                      {/* Search hits show highlighted matches */}
+                      {transcription.highlight && (
+                        <div className="mb-4">
+                          <p className="text-sm line-clamp-3" style={{ color: 'var(--theme-text)' }}>
+                            {renderHighlight(transcription.highlight)}
+                          </p>
                         </div>
                       )}
-                      {transcription.transcript && (
+                      {/* Short snippet only; full text is on the details page */}
+                      {transcription.snippet && (
                         <div className="mb-4">
                           <p className="text-sm line-clamp-3" style={{ color: 'var(--theme-text)' }}>
-                            {transcription.transcript}
+                            {transcription.snippet}
                           </p>
                         </div>
                       )}
@@ -271,6 +368,18 @@ const HistoryPage = () => {
                   </div>
                 </div>
               ))}
+              {(searchResults ? searchNextOffset !== null : nextCursor) && (
+                <div className="p-6 text-center">
+                  <button
+                    onClick={() => (searchResults ? runSearch(searchNextOffset) : loadMore())}
+                    disabled={isLoadingMore || isSearching}
+                    className="px-4 py-2 rounded-md text-sm disabled:opacity-50"
+                    style={{ background: 'var(--theme-heading)', color: '#fff' }}
+                  >
+                    {isLoadingMore ? 'Loading...' : 'Load More'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
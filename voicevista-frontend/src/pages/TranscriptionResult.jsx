@@ -2,12 +2,19 @@ import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import { Download, FileText } from 'lucide-react';
 import api from '../services/api';
+import AudioPlayer from '../components/AudioPlayer';
+
+const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
 const formatOptions = [
   { value: 'txt', label: 'TXT' },
   { value: 'pdf', label: 'PDF' },
   { value: 'docx', label: 'DOCX' },
+  { value: 'srt', label: 'SRT' },
+  { value: 'vtt', label: 'VTT' },
 ];
+// Subtitles come straight from the timestamped segments, in the transcript's language
+const subtitleFormats = ['srt', 'vtt'];
 const languageOptions = [
   { value: 'en', label: 'English' },
   { value: 'hi', label: 'Hindi' },
@@ -51,7 +58,9 @@ const TranscriptionResult = () => {
     if (!transcription) return;
     setDownloading(true);
     try {
-      const blob = await api.downloadTranscription(transcription.id, downloadFormat, downloadLang);
+      const blob = subtitleFormats.includes(downloadFormat)
+        ? await api.downloadSubtitles(transcription.id, downloadFormat)
+        : await api.downloadTranscription(transcription.id, downloadFormat, downloadLang);
       const ext = downloadFormat === 'docx' ? 'docx' : downloadFormat;
       const a = document.createElement('a');
       a.href = URL.createObjectURL(blob);
@@ -113,6 +122,7 @@ const TranscriptionResult = () => {
             <select
               value={downloadLang}
               onChange={e => setDownloadLang(e.target.value)}
+              disabled={subtitleFormats.includes(downloadFormat)}
               className="border rounded px-2 py-1 text-sm"
               style={{ background: 'var(--theme-bg)', color: 'var(--theme-text)', borderColor: 'rgba(255,255,255,0.08)' }}
             >
@@ -131,6 +141,11 @@ const TranscriptionResult = () => {
             </button>
           </div>
         </div>
+        {transcription.audio_url && (
+          <div className="mb-6">
+            <AudioPlayer audioUrl={`${API_BASE_URL}${transcription.audio_url}`} transcriptionId={transcription.id} />
+          </div>
+        )}
         <div className="border rounded-lg p-6 mb-6" style={{ background: 'var(--theme-bg)', color: 'var(--theme-text)', borderColor: 'rgba(255,255,255,0.08)' }}>
           <h2 className="text-xl font-semibold mb-4" style={{ color: 'var(--theme-heading)' }}>Summary</h2>
           <p className="leading-relaxed" style={{ color: 'var(--theme-text)' }}>
@@ -138,7 +153,12 @@ const TranscriptionResult = () => {
           </p>
         </div>
         <div className="border rounded-lg p-6" style={{ background: 'var(--theme-bg)', color: 'var(--theme-text)', borderColor: 'rgba(255,255,255,0.08)' }}>
-          <h2 className="text-xl font-semibold mb-4" style={{ color: 'var(--theme-heading)' }}>Full Transcript</h2>
+          <h2 className="text-xl font-semibold mb-4" style={{ color: 'var(--theme-heading)' }}>
+            Full Transcript
+            {transcription.partial && (
+              <span className="ml-2 text-sm font-normal">(in progress, {transcription.progress || 0}%)</span>
+            )}
+          </h2>
           <div className="whitespace-pre-line" style={{ color: 'var(--theme-text)' }}>
             {transcription.transcript || 'No transcript available.'}
           </div>
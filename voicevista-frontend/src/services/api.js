@@ -1,6 +1,9 @@
 // src/services/api.js (The Corrected and Complete Version)
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
+const RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const EXPORT_MAX_POLLS = 60;
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
 
 class ApiService {
     constructor( ) {
@@ -107,14 +110,34 @@ class ApiService {
     }
 
     // --- Transcriptions Methods ---
-    getTranscriptions() {
-        return this.request('/api/transcriptions');
+    // Returns one page: { items, next_cursor }. Pass next_cursor back to get the next page.
+    getTranscriptions({ limit = 20, cursor = null } = {}) {
+        const params = new URLSearchParams({ limit });
+        if (cursor) params.set('cursor', cursor);
+        return this.request(`/api/transcriptions?${params.toString()}`);
+    }
+
+    // Ranked server-side search: { items: [{ id, title, status, date, rank, highlight }], next_offset }
+    searchTranscriptions(query, { limit = 20, offset = 0 } = {}) {
+        const params = new URLSearchParams({ q: query, limit, offset });
+        return this.request(`/api/transcriptions/search?${params.toString()}`);
     }
 
     getTranscription(id) {
         return this.request(`/api/transcriptions/${id}`);
     }
 
+    // Timestamped segments, either those overlapping [start, end) (seconds)
+    // or the page after afterSeq. Returns { segments, next_seq }.
+    getTranscriptionSegments(id, { start, end, afterSeq, limit } = {}) {
+        const params = new URLSearchParams();
+        if (start !== undefined) params.set('start', start);
+        if (end !== undefined) params.set('end', end);
+        if (afterSeq !== undefined) params.set('after_seq', afterSeq);
+        if (limit !== undefined) params.set('limit', limit);
+        return this.request(`/api/transcriptions/${id}/segments?${params.toString()}`);
+    }
+
     deleteTranscription(id) {
         return this.request(`/api/transcriptions/${id}`, { method: 'DELETE' });
     }
@@ -123,7 +146,9 @@ class ApiService {
         return this.request('/api/transcriptions', { method: 'DELETE' });
     }
 
-    downloadTranscription(id, format = 'txt', lang = 'en') {
+    // Exports are rendered in the background; while one is being prepared the
+    // backend answers 202 with Retry-After, so keep asking (up to ~2 minutes).
+    downloadTranscription(id, format = 'txt', lang = 'en', attempt = 0) {
         const url = `${API_BASE_URL}/api/transcriptions/${id}/download?format=${format}&lang=${lang}`;
         const headers = {};
         if (this.token) {
@@ -134,6 +159,14 @@ class ApiService {
             method: 'GET',
             headers,
         }).then(response => {
+            if (response.status === 202) {
+                if (attempt >= EXPORT_MAX_POLLS) {
+                    throw new Error('The export is taking longer than expected. Please try again shortly.');
+                }
+                const delay = (parseInt(response.headers.get('Retry-After'), 10) || 2) * 1000;
+                return new Promise(resolve => setTimeout(resolve, delay))
+                    .then(() => this.downloadTranscription(id, format, lang, attempt + 1));
+            }
             if (!response.ok) {
                 return response.json().then(errorData => {
                     throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
@@ -143,20 +176,64 @@ class ApiService {
         });
     }
 
-    // --- File Upload Method (This is different, it's not JSON) ---
+    downloadSubtitles(id, format = 'srt') {
+        const url = `${API_BASE_URL}/api/transcriptions/${id}/subtitles?format=${format}`;
+        const headers = {};
+        if (this.token) {
+            headers['Authorization'] = `Bearer ${this.token}`;
+        }
+
+        return fetch(url, {
+            method: 'GET',
+            headers,
+        }).then(response => {
+            if (!response.ok) {
+                return response.json().then(errorData => {
+                    throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
+                });
+            }
+            return response.blob();
+        });
+    }
+
+    // --- Job Status Events (server-sent events) ---
+    // Calls onEvent({ event, id, title, status, progress, snippet }) for every
+    // change to one of the user's transcriptions. Returns an unsubscribe function.
+    subscribeToJobEvents(onEvent) {
+        const params = new URLSearchParams();
+        if (this.token) params.set('token', this.token);
+        const source = new EventSource(`${API_BASE_URL}/api/events?${params.toString()}`);
+        const handler = (e) => {
+            try {
+                onEvent(JSON.parse(e.data));
+            } catch (error) {
+                console.error('Bad job event:', error);
+            }
+        };
+        ['created', 'status', 'progress'].forEach((type) => source.addEventListener(type, handler));
+        return () => source.close();
+    }
+
+    // --- File Upload Methods (these are not JSON) ---
+    // Small files go up as a single raw-body request that the server streams
+    // straight to disk; large ones use the resumable chunked protocol.
     async uploadAudio(file) {
+        if (file.size > RESUMABLE_UPLOAD_THRESHOLD) {
+            return this.uploadAudioResumable(file);
+        }
         const url = `${API_BASE_URL}/api/upload`;
-        const formData = new FormData();
-        formData.append('audio', file);
 
-        const headers = {};
+        const headers = {
+            'Content-Type': 'application/octet-stream',
+            'X-Filename': encodeURIComponent(file.name),
+        };
         if (this.token) {
             headers['Authorization'] = `Bearer ${this.token}`;
         }
 
         const response = await fetch(url, {
             method: 'POST',
-            body: formData,
+            body: file,
             headers, // Pass the auth header here too
         });
 
@@ -166,6 +243,70 @@ class ApiService {
         }
         return response.json();
     }
+
+    // Uploads in UPLOAD_CHUNK_SIZE pieces; after a network error or a 409 it
+    // backs off, takes the server's current offset and continues from there.
+    async uploadAudioResumable(file, maxRetries = 5) {
+        const authHeaders = this.token ? { 'Authorization': `Bearer ${this.token}` } : {};
+
+        const created = await fetch(`${API_BASE_URL}/api/uploads`, {
+            method: 'POST',
+            headers: {
+                ...authHeaders,
+                'Upload-Length': String(file.size),
+                'X-Filename': encodeURIComponent(file.name),
+            },
+        });
+        if (!created.ok) {
+            const errorData = await created.json().catch(() => ({ message: 'An unknown error occurred' }));
+            throw new Error(errorData.message || `HTTP error! status: ${created.status}`);
+        }
+        const { upload_id: uploadId } = await created.json();
+        const uploadUrl = `${API_BASE_URL}/api/uploads/${uploadId}`;
+
+        let offset = 0;
+        let retries = 0;
+        while (true) {
+            let response;
+            try {
+                response = await fetch(uploadUrl, {
+                    method: 'PATCH',
+                    headers: {
+                        ...authHeaders,
+                        'Content-Type': 'application/offset+octet-stream',
+                        'Upload-Offset': String(offset),
+                    },
+                    body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE),
+                });
+            } catch (error) {
+                if (++retries > maxRetries) throw new Error('Network error. Please check your connection.');
+                await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+                const head = await fetch(uploadUrl, { method: 'HEAD', headers: authHeaders }).catch(() => null);
+                if (head && head.ok) offset = Number(head.headers.get('Upload-Offset'));
+                continue;
+            }
+
+            if (response.status === 409) {
+                // Offset drifted (e.g. a chunk landed but its response was lost),
+                // or another request still holds the upload: back off, then resume
+                // from the server's offset
+                if (++retries > maxRetries) throw new Error('Upload is busy. Please try again.');
+                const retryAfter = Number(response.headers.get('Retry-After')) || 0.5;
+                await new Promise((resolve) => setTimeout(resolve, 1000 * retryAfter * retries));
+                offset = Number(response.headers.get('Upload-Offset') || offset);
+                continue;
+            }
+            if (!response.ok) {
+                const errorData = await response.json().catch(() => ({ message: 'An unknown error occurred' }));
+                throw new Error(errorData.message || `HTTP error! status: ${response.status}`);
+            }
+            retries = 0;
+            if (response.status !== 204) {
+                return response.json(); // final chunk: same payload as uploadAudio
+            }
+            offset = Number(response.headers.get('Upload-Offset'));
+        }
+    }
 }
 
 const api = new ApiService();